@@ -0,0 +1,161 @@
+import numpy as np
+
+
+# Sort-and-sweep broadphase over arrays of axis-aligned bounding boxes
+# Replaces checking all n^2 pairs with could_collide: boxes are sorted by their min x,
+# so every box only gets compared against the boxes that start inside its own x range,
+# then those candidates are filtered on y and z. All vectorized, O(n log n + k) for k
+# candidate pairs.
+#
+# Periodic worlds (period=(lo, hi) corners of the domain) are handled with minimum-image
+# separations: on y/z directly, and on the sweep axis by sweeping ghost copies (shifted
+# up one period) of the boxes that sit near the bottom of the domain. Boxes are assumed
+# to be smaller than half the domain size.
+class SweepAndPrune:
+    # Domain corners and size for periodic worlds, None if not periodic
+    _period_lo: np.ndarray = None
+    _period_size: np.ndarray = None
+
+    # Bounding boxes from the last update, (n, 3) each
+    _lo: np.ndarray = None
+    _hi: np.ndarray = None
+
+    # Sweep axis from the last update: box indices sorted by min x, and their min x
+    _order: np.ndarray = None
+    _sorted_lo_x: np.ndarray = None
+
+    # Widest box along x, bounds how far back a range query looks in the sorted order
+    _max_width_x: float = 0.0
+
+    # Fused kernel backend (see Kernels) for the y/z filter, None for plain NumPy
+    _kernels = None
+
+    def __init__(self, period=None, kernels=None):
+        if period is not None:
+            self._period_lo = np.asarray(period[0], dtype=float)
+            self._period_size = np.asarray(period[1], dtype=float) - self._period_lo
+
+        self._kernels = kernels
+
+        self.update(np.zeros((0, 3)), np.zeros((0, 3)))
+
+    @property
+    def periodic(self):
+        return self._period_size is not None
+
+    # Rebuild from fresh bounding boxes, (n, 3) min corners and (n, 3) max corners
+    def update(self, lo, hi):
+        self._lo = np.asarray(lo, dtype=float)
+        self._hi = np.asarray(hi, dtype=float)
+
+        self._order = np.argsort(self._lo[:, 0], kind="stable")
+        self._sorted_lo_x = self._lo[self._order, 0]
+        self._max_width_x = (
+            float(np.max(self._hi[:, 0] - self._lo[:, 0])) if len(self._lo) else 0.0
+        )
+
+    # Minimum-image version of separation vectors (identity if not periodic)
+    def minimum_image(self, delta):
+        if not self.periodic:
+            return delta
+
+        return delta - self._period_size * np.round(delta / self._period_size)
+
+    # All pairs of overlapping boxes, (k, 2) with i < j, sorted by (i, j)
+    def pairs(self):
+        lo, hi = self._lo, self._hi
+        ids = np.arange(len(lo))
+
+        if self.periodic:
+            # Ghosts of the boxes near the bottom of the domain, moved up one period
+            # along x
+            near_bottom = lo[:, 0] < self._period_lo[0] + self._max_width_x
+            shift = np.array([self._period_size[0], 0.0, 0.0])
+
+            ids = np.concatenate([ids, ids[near_bottom]])
+            lo = np.concatenate([lo, lo[near_bottom] + shift])
+            hi = np.concatenate([hi, hi[near_bottom] + shift])
+
+        order = np.argsort(lo[:, 0], kind="stable")
+        sorted_lo_x = lo[order, 0]
+        sorted_hi_x = hi[order, 0]
+
+        # Sorted slot k overlaps (on x) every slot from k + 1 up to the last one
+        # starting before it ends
+        end = np.searchsorted(sorted_lo_x, sorted_hi_x, side="right")
+        counts = np.maximum(end - np.arange(len(order)) - 1, 0)
+
+        a = np.repeat(np.arange(len(order)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        b = a + 1 + offsets
+
+        a = order[a]
+        b = order[b]
+
+        keep = ids[a] != ids[b]
+        a, b = a[keep], b[keep]
+
+        # y and z overlap, through the minimum image when periodic
+        center = (lo + hi) / 2
+        half = (hi - lo) / 2
+        if self._kernels is not None:
+            period = self._period_size if self.periodic else np.zeros(3)
+            keep = self._kernels.sweep_overlap(
+                center[a], half[a], center[b], half[b], period
+            )
+        else:
+            delta = self.minimum_image(center[b] - center[a])
+            reach = half[a] + half[b]
+            keep = np.all(np.abs(delta[:, 1:]) <= reach[:, 1:], axis=1)
+
+        i, j = ids[a[keep]], ids[b[keep]]
+        pairs = np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1)
+
+        if len(pairs) == 0:
+            return pairs.reshape(0, 2)
+
+        return np.unique(pairs, axis=0)
+
+    # Boxes overlapping each query box. qlo, qhi: (m, 3) (or (3,) for a single query)
+    # Returns a list of m index arrays (sorted)
+    def query_aabb(self, qlo, qhi):
+        qlo = np.atleast_2d(np.asarray(qlo, dtype=float))
+        qhi = np.atleast_2d(np.asarray(qhi, dtype=float))
+
+        center = (self._lo + self._hi) / 2
+        half = (self._hi - self._lo) / 2
+
+        shifts = [0.0]
+        if self.periodic:
+            shifts = [0.0, -self._period_size[0], self._period_size[0]]
+
+        results = []
+        for q_lo, q_hi in zip(qlo, qhi):
+            # Any box overlapping the query on x starts less than a box width before it,
+            # and before it ends
+            candidates = []
+            for shift in shifts:
+                start = np.searchsorted(
+                    self._sorted_lo_x, q_lo[0] + shift - self._max_width_x, side="left"
+                )
+                end = np.searchsorted(self._sorted_lo_x, q_hi[0] + shift, side="right")
+                candidates.append(self._order[start:end])
+
+            candidates = np.unique(np.concatenate(candidates))
+
+            delta = self.minimum_image(center[candidates] - (q_lo + q_hi) / 2)
+            reach = half[candidates] + (q_hi - q_lo) / 2
+            hit = np.all(np.abs(delta) <= reach, axis=1)
+
+            results.append(candidates[hit])
+
+        return results
+
+    # Bounding box around everything, (min corner, max corner), or None if empty
+    def extent(self):
+        if len(self._lo) == 0:
+            return None
+
+        return self._lo.min(axis=0), self._hi.max(axis=0)
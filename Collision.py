@@ -11,32 +11,164 @@ class Collision:
         self.depth = depth  # length of overlap A to B
 
 
+# Stand-in for an object at another position, for trial collision checks that mustn't
+# move the real object (e.g. resolving pairs side by side, or against a periodic image)
+class ShapeProxy:
+    __slots__ = ("position", "physical_primitive_type", "radius", "size")
+
+    def __init__(self, obj, position):
+        self.position = position
+        self.physical_primitive_type = obj.physical_primitive_type
+
+        if obj.physical_primitive_type == PhysicalPrimitiveType.SPHERE:
+            self.radius = obj.radius
+        else:
+            self.size = obj.size
+
+
+# Half extents of an object's axis-aligned bounding box, as a numpy vector
+def half_extents(obj):
+    if obj.physical_primitive_type == PhysicalPrimitiveType.SPHERE:
+        return np.array([obj.radius, obj.radius, obj.radius], dtype=float)
+
+    sz = obj.size
+    return np.array([sz.x, sz.y, sz.z], dtype=float) / 2
+
+
+# Axis-aligned bounding boxes of many objects, as (min corners, max corners), (n, 3)
+# Built from the physics positions (the VPython ones only sync on display updates)
+def aabb_arrays(objects):
+    if len(objects) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3))
+
+    positions = np.array([obj.position for obj in objects], dtype=float)
+    half = np.array([half_extents(obj) for obj in objects])
+
+    return positions - half, positions + half
+
+
+# Swept-sphere tests (continuous collision detection)
+# A sphere moving by d over a step, against k other shapes, all in the other shape's
+# frame: m is the sphere's center relative to the other shape's center at the start of
+# the step, d the relative displacement. Both return the time of impact as a fraction of
+# the step, in [0, 1], or inf for no impact within the step. Shapes already overlapping
+# at the start are left to the discrete narrowphase (inf).
+
+
+# Against spheres: |m + t d| = reach, with reach the sum of radii (k,)
+def sweep_spheres(m, d, reach):
+    a = np.einsum("ij,ij->i", d, d)
+    b_half = np.einsum("ij,ij->i", m, d)
+    c = np.einsum("ij,ij->i", m, m) - reach * reach
+    disc = b_half * b_half - a * c
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (-b_half - np.sqrt(np.maximum(disc, 0.0))) / a
+
+    hit = (c > 0) & (b_half < 0) & (disc >= 0) & (a > 0) & (t <= 1)
+    return np.where(hit, t, np.inf)
+
+
+# Against origin-centered axis-aligned boxes, half extents half (k, 3), radius (k,)
+# The center's path is clipped to the box grown by the radius, which is exact on the
+# faces; near edges and corners (where the grown box is rounded, not square) the first
+# touch is found by bisection.
+def sweep_boxes(m, d, radius, half, iterations=32):
+    def gap(t):
+        return _sphere_box_gap(m, d, radius, half, t)
+
+    start_gap = gap(np.zeros(len(m)))
+
+    grown = half + radius[:, np.newaxis]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t1 = (-grown - m) / d
+        t2 = (grown - m) / d
+
+    # Paths parallel to a slab: inside it for the whole step, or never
+    parallel = d == 0
+    inside = np.abs(m) <= grown
+    t1 = np.where(parallel, np.where(inside, -np.inf, np.inf), t1)
+    t2 = np.where(parallel, np.where(inside, np.inf, -np.inf), t2)
+
+    t_enter = np.maximum(np.max(np.minimum(t1, t2), axis=1), 0.0)
+    t_exit = np.minimum(np.min(np.maximum(t1, t2), axis=1), 1.0)
+
+    candidate = (start_gap > 0) & (t_enter <= t_exit)
+    t = np.where(candidate, t_enter, np.inf)
+
+    # Entered the grown box at an edge/corner region without touching the real (rounded)
+    # shape yet
+    rounded = candidate & (gap(np.where(candidate, t_enter, 0.0)) > 1e-9 * radius)
+    if not rounded.any():
+        return t
+
+    idx = np.flatnonzero(rounded)
+    lo, hi = t_enter[idx], t_exit[idx]
+
+    def gap(t):
+        return _sphere_box_gap(m[idx], d[idx], radius[idx], half[idx], t)
+
+    # The gap is convex along the path: ternary search for its minimum, a miss if it
+    # stays positive...
+    a, b = lo.copy(), hi.copy()
+    for _ in range(iterations):
+        third = (b - a) / 3
+        left = gap(a + third) < gap(b - third)
+        b = np.where(left, b - third, b)
+        a = np.where(left, a, a + third)
+    t_min = (a + b) / 2
+    touches = gap(t_min) <= 0
+
+    # ...then bisect for the first touch before it
+    a, b = lo, t_min
+    for _ in range(iterations):
+        mid = (a + b) / 2
+        inside = gap(mid) <= 0
+        b = np.where(inside, mid, b)
+        a = np.where(inside, a, mid)
+
+    t[idx] = np.where(touches, b, np.inf)
+    return t
+
+
+# Distance between the box (centered at the origin) and the sphere's surface at times t
+# along its path
+def _sphere_box_gap(m, d, radius, half, t):
+    center = m + t[:, np.newaxis] * d
+    closest = np.clip(center, -half, half)
+    return np.linalg.norm(center - closest, axis=1) - radius
+
+
 # Check axis-aligned bounding box intersection before dispatching to more fine-grained collision checks
 def could_collide(aObj, bObj):
-    aBbox = aObj.bounding_box()
-    bBbox = bObj.bounding_box()
-
     # Figured out 1D case with visualization as aid https://www.desmos.com/calculator/3otpyjpx3y
     #   & moving two dice around in real life to help extend to the 3D case
+    # Two boxes overlap iff their centers are no further apart than the sum of half
+    # extents, on every axis
+    reach = half_extents(aObj) + half_extents(bObj)
+
+    return bool(np.all(np.abs(bObj.position - aObj.position) <= reach))
 
-    # Unoptimized case (optimized involves interleaving the axis checks with the axis min/max finding)
-    # TODO: If performance issues still after typechecking removal, optimize this as well
-    a_min_x, a_max_x = aBbox[0].x, aBbox[7].x
-    a_min_y, a_max_y = aBbox[0].y, aBbox[7].y
-    a_min_z, a_max_z = aBbox[0].z, aBbox[7].z
 
-    b_min_x, b_max_x = bBbox[0].x, bBbox[7].x
-    b_min_y, b_max_y = bBbox[0].y, bBbox[7].y
-    b_min_z, b_max_z = bBbox[0].z, bBbox[7].z
+# Distance between the surfaces of two axis-aligned shapes, 0 if they touch or overlap
+# The two can't come into contact before they've moved this far (combined) towards each
+# other.
+def separation(aObj, bObj):
+    if aObj.physical_primitive_type > bObj.physical_primitive_type:
+        return separation(bObj, aObj)
+
+    d = np.abs(np.asarray(bObj.position, dtype=float) - aObj.position)
+
+    if aObj.physical_primitive_type == PhysicalPrimitiveType.SPHERE:
+        if bObj.physical_primitive_type == PhysicalPrimitiveType.SPHERE:
+            gap = np.linalg.norm(d) - aObj.radius - bObj.radius
+        else:
+            gap = np.linalg.norm(np.maximum(d - half_extents(bObj), 0.0)) - aObj.radius
+    else:
+        reach = half_extents(aObj) + half_extents(bObj)
+        gap = np.linalg.norm(np.maximum(d - reach, 0.0))
 
-    return (
-        a_max_x >= b_min_x
-        and a_min_x <= b_max_x
-        and a_max_y >= b_min_y
-        and a_min_y <= b_max_y
-        and a_max_z >= b_min_z
-        and a_min_z <= b_max_z
-    )
+    return max(float(gap), 0.0)
 
 
 def unitv(v):
@@ -44,7 +176,7 @@ def unitv(v):
     if mag != 0:
         return v / mag
     else:
-        return np.array([0, 0, 0])
+        return np.zeros_like(v, dtype=np.result_type(v, np.float32))
 
 
 def does_collide(aObj, bObj):
@@ -77,7 +209,7 @@ def does_collide(aObj, bObj):
 
                 depth = np.linalg.norm(b_far - a_far)
 
-                return Collision(a_far, b_far, dist)
+                return Collision(a_far, b_far, depth)
             else:
                 return None
         elif bObj.physical_primitive_type == PhysicalPrimitiveType.BOX:  # Sphere v. box
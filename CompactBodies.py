@@ -0,0 +1,177 @@
+import math
+
+import numpy as np
+
+from vpython import vector
+
+from PhysicalMixin import PhysicalMixin, PhysicalPrimitiveType, np2vpy
+from PhysicalSphere import PhysicalSphere
+from PhysicalBox import PhysicalBox
+
+
+# Lightweight bodies for headless runs (no display, lots of bodies)
+# Same PhysicalMixin contract as PhysicalSphere/PhysicalBox, so PhysicsEngine takes them
+# as is, but without the VPython object underneath and with __slots__ instead of a
+# per-instance __dict__. Cheaper to create, smaller in memory and faster to pickle.
+#
+# Positions are plain numpy arrays (pos=[x, y, z]) rather than VPython vectors.
+# Use to_physical()/from_physical() to swap to/from the VPython-backed classes for
+# visualization.
+class CompactBody(PhysicalMixin):
+    __slots__ = (
+        "_mass",
+        "_net_force",
+        "_coeff_drag",
+        "_position",
+        "_prev_position",
+        "_velocity",
+        "_static",
+        "_immovable",
+        "_crosssectional_area",
+        "grounded",
+        "_average_dist",
+        "_visitor",
+        "_visitor_state",
+        "physical_primitive_type",
+    )
+
+    def __init__(self, **kwargs):
+        # Slots have no class-level fallback, so give the optional ones a value up front
+        self._visitor = None
+        self._visitor_state = None
+
+        pos = kwargs.pop("pos", None)
+
+        super(CompactBody, self).__init__(**kwargs)
+
+        if pos is not None:
+            self._position = np.array(pos, dtype=float)
+
+    # Axis-aligned extents around the physics position, as (min corner, max corner)
+    def _extents(self):
+        raise UserWarning("Please define _extents.")
+
+    # Same corner layout as VPython's bounding_box (0 is the min corner, 7 the max)
+    def bounding_box(self):
+        lo, hi = self._extents()
+
+        pts = []
+        for x in (lo[0], hi[0]):
+            for y in (lo[1], hi[1]):
+                for z in (lo[2], hi[2]):
+                    pts.append(vector(x, y, z))
+        return pts
+
+    # Copy the physical state shared by every body type onto another body
+    def _copy_state_to(self, other):
+        other.static = self.static
+        other.immovable = False  # so the velocity below isn't dropped
+        other.velocity = np.array(self.velocity, dtype=float)
+        other.immovable = self.immovable
+        other.position = np.array(self.position, dtype=float)
+        other.grounded = self.grounded
+        other._average_dist = self._average_dist
+        other._visitor = self._visitor
+        other._visitor_state = self._visitor_state
+        return other
+
+    # kwargs needed to rebuild a body from a VPython-backed one
+    @staticmethod
+    def _kwargs_from_physical(obj):
+        kwargs = {
+            "mass": obj.mass,
+            "pos": np.array(obj.position, dtype=float),
+            "velocity": np.array(obj.velocity, dtype=float),
+            "static": obj.static,
+            "immovable": obj.immovable,
+        }
+
+        if obj._visitor is not None:
+            kwargs["visitor"] = obj._visitor
+
+        return kwargs
+
+
+class CompactSphere(CompactBody):
+    __slots__ = ("radius",)
+
+    def __init__(self, **kwargs):
+        self.physical_primitive_type = PhysicalPrimitiveType.SPHERE
+
+        # https://en.wikipedia.org/wiki/Drag_coefficient
+        self._coeff_drag = 0.47
+
+        self.radius = kwargs.pop("radius", 1.0)
+
+        super(CompactSphere, self).__init__(**kwargs)
+
+        self.crosssectional_area = math.pi * self.radius**2
+
+    def _extents(self):
+        return self._position - self.radius, self._position + self.radius
+
+    @property
+    def volume(self):
+        return 4 / 3.0 * math.pi * self.radius**3
+
+    # PhysicalSphere with the same state (extra kwargs go to VPython, e.g. color)
+    def to_physical(self, **kwargs):
+        obj = PhysicalSphere(
+            pos=np2vpy(self.position), radius=self.radius, mass=self.mass, **kwargs
+        )
+        return self._copy_state_to(obj)
+
+    @classmethod
+    def from_physical(cls, obj):
+        if obj.physical_primitive_type != PhysicalPrimitiveType.SPHERE:
+            raise UserWarning("CompactSphere: can only convert from a sphere.")
+
+        compact = cls(radius=obj.radius, **cls._kwargs_from_physical(obj))
+        compact.grounded = obj.grounded
+        compact._average_dist = obj._average_dist
+        return compact
+
+
+class CompactBox(CompactBody):
+    __slots__ = ("size",)
+
+    def __init__(self, **kwargs):
+        self.physical_primitive_type = PhysicalPrimitiveType.BOX
+
+        # https://en.wikipedia.org/wiki/Drag_coefficient
+        self._coeff_drag = 1.05  # assumes velocity is normal to a face
+
+        # Kept as a VPython vector since collision code reads size.x/.y/.z
+        size = kwargs.pop("size", vector(1, 1, 1))
+        self.size = size if isinstance(size, vector) else np2vpy(size)
+
+        super(CompactBox, self).__init__(**kwargs)
+
+        # Very bad approximation (same as PhysicalBox)
+        self.crosssectional_area = self.size.x * self.size.z
+
+    def _extents(self):
+        half = np.array([self.size.x, self.size.y, self.size.z]) / 2
+        return self._position - half, self._position + half
+
+    @property
+    def volume(self):
+        sz = self.size
+        return sz.x * sz.y * sz.z
+
+    # PhysicalBox with the same state (extra kwargs go to VPython, e.g. color)
+    def to_physical(self, **kwargs):
+        obj = PhysicalBox(
+            pos=np2vpy(self.position), size=vector(self.size), mass=self.mass, **kwargs
+        )
+        return self._copy_state_to(obj)
+
+    @classmethod
+    def from_physical(cls, obj):
+        if obj.physical_primitive_type != PhysicalPrimitiveType.BOX:
+            raise UserWarning("CompactBox: can only convert from a box.")
+
+        compact = cls(size=vector(obj.size), **cls._kwargs_from_physical(obj))
+        compact.grounded = obj.grounded
+        compact._average_dist = obj._average_dist
+        return compact
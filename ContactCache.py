@@ -0,0 +1,89 @@
+import numpy as np
+
+from Collision import does_collide, separation
+
+
+# Persistent narrowphase results, keyed by body pair (handles, so they survive removals)
+# Near misses give the same "not touching" answer step after step: when does_collide
+# finds a pair apart, the gap between the two shapes is cached with their positions,
+# and until the two bodies have moved that far (combined) neither can have reached the
+# other, so the narrowphase is skipped. Contacts themselves are never cached: solving
+# one rewinds both bodies and changes their velocities, so a pair that touches is
+# checked again every step. Pairs whose bounding boxes no longer overlap are evicted
+# every step.
+#
+# `tolerance` caps how far either body may move before a cached result is rechecked
+# anyway; hit/miss/eviction counts are kept to tune it.
+class ContactCache:
+    # Max distance either body may move before a cached result is recomputed
+    _tolerance: float
+
+    # (handle a, handle b) -> (position a, position b, gap between the two shapes)
+    _entries: dict = None
+
+    # Counters since the last reset_stats()
+    _hits: int = 0
+    _misses: int = 0
+    _evictions: int = 0
+
+    def __init__(self, tolerance):
+        if tolerance < 0:
+            raise UserWarning("ContactCache: tolerance can't be negative.")
+
+        self._tolerance = tolerance
+        self._entries = {}
+
+    # does_collide(aObj, bObj), skipped (None) while the pair provably can't touch yet
+    def collide(self, key, aObj, bObj):
+        entry = self._entries.get(key)
+
+        if entry is not None:
+            cached_a, cached_b, gap = entry
+            da = np.linalg.norm(aObj.position - cached_a)
+            db = np.linalg.norm(bObj.position - cached_b)
+
+            if da + db < gap and max(da, db) <= self._tolerance:
+                self._hits += 1
+                return None
+
+        result = does_collide(aObj, bObj)
+        self._misses += 1
+
+        if result is None:
+            gap = separation(aObj, bObj)
+            self._entries[key] = (np.array(aObj.position), np.array(bObj.position), gap)
+        else:
+            self._entries.pop(key, None)
+
+        return result
+
+    # Drop every pair that's not in `live_keys` (the pairs the broadphase still reports)
+    def evict_except(self, live_keys):
+        live_keys = set(live_keys)
+        stale = [key for key in self._entries if key not in live_keys]
+
+        for key in stale:
+            del self._entries[key]
+
+        self._evictions += len(stale)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "hit_rate": self._hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+    def reset_stats(self):
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,360 @@
+import multiprocessing
+
+import numpy as np
+
+from PhysicsEngine import PhysicsEngine
+from PhysicalMixin import PhysicalPrimitiveType
+from CompactBodies import CompactBody, CompactSphere, CompactBox
+from Kernels import get_kernels, warm_up
+
+
+# Domain-decomposed physics: the world is cut into slabs along one axis, and each slab
+# is owned by a worker process stepping its own PhysicsEngine. Drives like a
+# PhysicsEngine (register_object, register_many, add_force_applicator, iterate(dt)), for
+# worlds too big for one process.
+#
+# Every step, each worker:
+#   - takes in bodies migrating into its slab, and ghost copies of its neighbours'
+#     bodies within `halo` of the shared boundary (ghosts are immovable, so they push
+#     owned bodies but are never moved here)
+#   - steps its engine
+#   - drops the ghosts, hands off owned bodies that left its slab, and reports its own
+#     boundary bodies as ghosts for the neighbours' next step
+# All messages go through the driver over pipes, one round trip per worker per step.
+#
+# Bodies live in other processes, so they have to be picklable: VPython-backed bodies
+# are converted to CompactSphere/CompactBox on registration, and visitors must be
+# module-level functions. Each contact near a boundary is solved on both sides (each
+# side moving only its own body), and force applicators only see a worker's own bodies
+# plus ghosts, so long-range forces like MutualGravity are cut off at the halo.
+class DistributedEngine:
+    # Pipes to the workers, in slab order
+    _conns: list = None
+
+    # Worker processes, in slab order
+    _processes: list = None
+
+    # Slab boundaries along _axis, len(workers) + 1 values from the world's min to max
+    _edges: np.ndarray = None
+
+    # Axis the world is cut along, 0 = x
+    _axis: int
+
+    # Width of the band along each boundary that gets copied to the neighbour as ghosts
+    _halo: float
+
+    # True for periodic world bounds, makes the first and last slab neighbours
+    _periodic: bool
+
+    # Bodies waiting to be handed to each worker with its next message
+    _pending: list = None
+
+    # Ghosts each worker gets on its next step
+    _ghosts: list = None
+
+    # Number of completed iterations
+    _step: int = 0
+
+    # Needs bounds=(lo, hi) (split into slabs) plus any PhysicsEngine kwargs, which
+    # every worker gets.
+    # workers: number of slabs/processes, axis: axis to cut along, halo: ghost band size
+    def __init__(self, workers=2, axis=0, halo=1.0, **kwargs):
+        if "bounds" not in kwargs or kwargs["bounds"] is None:
+            raise UserWarning(
+                "DistributedEngine: needs world bounds to split into slabs."
+            )
+
+        if workers < 1:
+            raise UserWarning("DistributedEngine: need at least one worker.")
+
+        lo, hi = (np.asarray(c, dtype=float) for c in kwargs["bounds"])
+
+        self._axis = axis
+        self._halo = halo
+        self._edges = np.linspace(lo[axis], hi[axis], workers + 1)
+        self._periodic = "bounds_mode" in kwargs and kwargs["bounds_mode"] == "periodic"
+
+        if halo * 2 > self._edges[1] - self._edges[0]:
+            raise UserWarning(
+                "DistributedEngine: halo must be at most half a slab wide."
+            )
+
+        self._pending = [[] for _ in range(workers)]
+        self._ghosts = [[] for _ in range(workers)]
+        self._conns = []
+        self._processes = []
+
+        for k in range(workers):
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_worker_main,
+                args=(
+                    child_conn,
+                    kwargs,
+                    self._edges[k],
+                    self._edges[k + 1],
+                    axis,
+                    halo,
+                    k == workers - 1,
+                ),
+                daemon=True,
+            )
+            process.start()
+            child_conn.close()
+
+            self._conns.append(parent_conn)
+            self._processes.append(process)
+
+    # Index of the slab owning each coordinate along the split axis
+    def _owner(self, coords):
+        inner_edges = self._edges[1:-1]
+        return np.searchsorted(inner_edges, coords, side="right")
+
+    def _request(self, k, *message):
+        self._conns[k].send(message)
+        reply = self._conns[k].recv()
+
+        if isinstance(reply, Exception):
+            raise reply
+
+        return reply
+
+    # Add a body to whichever worker owns its position
+    # Returns self for chaining, like PhysicsEngine.
+    def register_object(self, physical_object):
+        if not isinstance(physical_object, CompactBody):
+            if physical_object.physical_primitive_type == PhysicalPrimitiveType.SPHERE:
+                physical_object = CompactSphere.from_physical(physical_object)
+            else:
+                physical_object = CompactBox.from_physical(physical_object)
+
+        k = int(self._owner(physical_object.position[self._axis]))
+        self._pending[k].append(physical_object)
+
+        return self
+
+    # Same arguments as PhysicsEngine.register_many, bodies go to their owners in bulk
+    # Returns self rather than handles: handles are per-worker, and bodies change
+    # workers (and so handles) as they migrate.
+    def register_many(self, positions, velocities=None, **kwargs):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        n = len(positions)
+
+        if velocities is None:
+            velocities = np.zeros((n, 3))
+        velocities = np.broadcast_to(np.asarray(velocities, dtype=float), (n, 3))
+
+        # Per-body array arguments get split along with the bodies, the rest is shared
+        per_body = {}
+        for key, per_body_ndim in (
+            ("masses", 1),
+            ("shapes", 1),
+            ("radii", 1),
+            ("sizes", 2),
+        ):
+            if key in kwargs and np.ndim(kwargs[key]) == per_body_ndim:
+                per_body[key] = np.asarray(kwargs.pop(key))
+
+        owners = self._owner(positions[:, self._axis])
+        for k in range(len(self._conns)):
+            mine = owners == k
+            if not mine.any():
+                continue
+
+            worker_kwargs = dict(kwargs)
+            for key, value in per_body.items():
+                worker_kwargs[key] = value[mine]
+
+            self._request(
+                k, "register_many", positions[mine], velocities[mine], worker_kwargs
+            )
+
+        return self
+
+    # Give every worker a copy of a force applicator (must be picklable)
+    def add_force_applicator(self, force_applicator):
+        for k in range(len(self._conns)):
+            self._request(k, "add_force_applicator", force_applicator)
+
+        return self
+
+    def iterate(self, dt):
+        # Send everyone their step first so the workers run concurrently, then collect
+        for k, conn in enumerate(self._conns):
+            conn.send(("step", dt, self._pending[k], self._ghosts[k]))
+
+        # Drain every reply before raising, or a failed step would leave the other
+        # workers' replies in the pipes to be mistaken for answers to later requests
+        replies = [conn.recv() for conn in self._conns]
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+
+        workers = len(self._conns)
+        self._pending = [[] for _ in range(workers)]
+        self._ghosts = [[] for _ in range(workers)]
+
+        for k, (emigrants, lower_halo, upper_halo) in enumerate(replies):
+            if emigrants:
+                owners = self._owner(
+                    np.array([b.position[self._axis] for b in emigrants])
+                )
+                for body, owner in zip(emigrants, owners):
+                    self._pending[owner].append(body)
+
+            # Neighbour slabs (wrapping around for periodic worlds)
+            below = k - 1 if k > 0 else (workers - 1 if self._periodic else None)
+            above = k + 1 if k < workers - 1 else (0 if self._periodic else None)
+
+            if below is not None and below != k:
+                self._ghosts[below].extend(lower_halo)
+            if above is not None and above != k:
+                self._ghosts[above].extend(upper_halo)
+
+        self._step += 1
+
+    # Deliver any bodies still waiting for their worker (so queries see everything)
+    def _flush(self):
+        for k in range(len(self._conns)):
+            if self._pending[k]:
+                self._request(k, "register", self._pending[k])
+                self._pending[k] = []
+
+    # World state as arrays (see PhysicsEngine.state_arrays), slab by slab
+    # Handles are per-worker.
+    def state_arrays(self):
+        self._flush()
+        states = [self._request(k, "state") for k in range(len(self._conns))]
+
+        return {
+            "step": self._step,
+            "worker": np.concatenate(
+                [np.full(len(s["masses"]), k, dtype=int) for k, s in enumerate(states)]
+            ),
+            "handles": np.concatenate([s["handles"] for s in states]),
+            "positions": np.concatenate([s["positions"] for s in states]),
+            "velocities": np.concatenate([s["velocities"] for s in states]),
+            "masses": np.concatenate([s["masses"] for s in states]),
+        }
+
+    # Copies of every body in the world (e.g. to convert with to_physical() for display)
+    def gather(self):
+        self._flush()
+        return [
+            body for k in range(len(self._conns)) for body in self._request(k, "bodies")
+        ]
+
+    def __len__(self):
+        self._flush()
+        return sum(self._request(k, "count") for k in range(len(self._conns)))
+
+    # Stop the workers
+    def close(self):
+        for conn, process in zip(self._conns, self._processes):
+            try:
+                conn.send(("stop",))
+            except (BrokenPipeError, OSError):
+                pass
+
+            process.join()
+            conn.close()
+
+        self._conns = []
+        self._processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def step(self):
+        return self._step
+
+
+# Worker process loop, owns bodies in [slab_lo, slab_hi) along axis
+# (slab_hi inclusive for the last slab)
+def _worker_main(conn, engine_kwargs, slab_lo, slab_hi, axis, halo, last):
+    engine = PhysicsEngine(**engine_kwargs)
+
+    # Load/compile JIT kernels before the first step rather than during it
+    if "kernels" in engine_kwargs and engine_kwargs["kernels"] is not None:
+        warm_up(get_kernels(engine_kwargs["kernels"]))
+
+    def owned(coords):
+        if last:
+            return (coords >= slab_lo) & (coords <= slab_hi)
+        return (coords >= slab_lo) & (coords < slab_hi)
+
+    while True:
+        message = conn.recv()
+        command = message[0]
+
+        if command == "stop":
+            break
+
+        try:
+            if command == "step":
+                _, dt, immigrants, ghosts = message
+
+                for body in immigrants:
+                    engine.register_object(body)
+
+                ghost_handles = []
+                for ghost in ghosts:
+                    ghost.immovable = True
+                    engine.register_object(ghost)
+                    ghost_handles.append(engine.handle_of(ghost))
+
+                engine.iterate(dt)
+
+                # Ghosts may have been despawned by world bounds already
+                alive = set(engine.handles.tolist())
+                for handle in ghost_handles:
+                    if handle in alive:
+                        engine.remove(handle)
+
+                objects = list(engine.objects)
+                coords = np.array([obj.position[axis] for obj in objects], dtype=float)
+
+                # Pick everything out before removing, removal reorders engine.objects
+                leaving = ~owned(coords)
+                lower = ~leaving & (coords < slab_lo + halo)
+                upper = ~leaving & (coords > slab_hi - halo)
+
+                emigrants = [objects[i] for i in np.flatnonzero(leaving)]
+                lower_halo = [objects[i] for i in np.flatnonzero(lower)]
+                upper_halo = [objects[i] for i in np.flatnonzero(upper)]
+
+                engine.remove_where(leaving)
+
+                conn.send((emigrants, lower_halo, upper_halo))
+            elif command == "register":
+                for body in message[1]:
+                    engine.register_object(body)
+                conn.send(None)
+            elif command == "register_many":
+                _, positions, velocities, kwargs = message
+                engine.register_many(positions, velocities, **kwargs)
+                conn.send(None)
+            elif command == "add_force_applicator":
+                engine.add_force_applicator(message[1])
+                conn.send(None)
+            elif command == "state":
+                conn.send(engine.state_arrays())
+            elif command == "bodies":
+                conn.send(list(engine.objects))
+            elif command == "count":
+                conn.send(len(engine))
+            else:
+                conn.send(
+                    UserWarning(
+                        f"DistributedEngine worker: unknown command '{command}'."
+                    )
+                )
+        except Exception as e:
+            conn.send(e)
+
+    engine.shutdown()
+    conn.close()
@@ -1,8 +1,46 @@
+import numpy as np
+
+
 # Base class for defining force applicators (e.g. Electromagnetism, Friction, Gravity, Gravity but with general relativity, etc)
 class IForceApplicator:
+    # Parallel backend (see ParallelBackend), set by the engine, None for a single core
+    _backend = None
+
+    # Float type to compute forces in, set by the engine to match its state dtype
+    _dtype = float
+
+    # Fused kernel backend (see Kernels), set by the engine, None for plain NumPy code
+    _kernels = None
+
     def __init__(self):
         return
 
     # Apply forces to world objects as relevant to whatever force applicator type this is
     def apply_forces(self, objects, dt):
         raise UserWarning("Please define apply_force.")
+
+    # Potential energy of bodies at positions (n, 3) with masses (n,) in this force's
+    # field, for telemetry. 0.0 for forces that don't store energy (e.g. drag), None if
+    # it isn't known.
+    def potential_energy(self, positions, masses):
+        return None
+
+    # Hand this applicator a parallel backend to split its work over (it may ignore it)
+    def set_backend(self, backend):
+        self._backend = backend
+
+    # Run fn(start, stop) -> rows for bodies start..stop, over chunks on the backend if
+    # there is one, and stack the rows back up in order
+    def _over_bodies(self, fn, n):
+        if self._backend is None:
+            return fn(0, n)
+
+        return np.concatenate(self._backend.map_chunks(fn, n))
+
+    # Compute in this dtype (e.g. np.float32) so kernels don't upcast the engine's state
+    def set_dtype(self, dtype):
+        self._dtype = dtype
+
+    # Use these fused kernels for hot loops where the applicator has one
+    def set_kernels(self, kernels):
+        self._kernels = kernels
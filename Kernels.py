@@ -0,0 +1,232 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:  # optional, everything falls back to the NumPy kernels
+    numba = None
+
+
+# Fused kernels for the hot paths: integration (PhysicsEngine.iterate), the
+# broadphase's overlap filter (SweepAndPrune.pairs), narrowphase contact tests
+# (does_collide) and air density (AirResistanceApplicator.rho).
+#
+# Two interchangeable backends with the same functions:
+#   NumpyKernels - plain vectorized NumPy, always available
+#   NumbaKernels - the same math as compiled loops, no temporary arrays. Only if numba
+#                  is installed.
+# Integration and the overlap/contact masks give identical results on both. Air
+# density doesn't (compiled pow vs NumPy's): up to ~10 ulp in float32 (~5e-7 kg/m^3
+# near sea level) and a few ulp in float64.
+# get_kernels("auto") picks Numba when it's there and NumPy otherwise.
+#
+# Numba compiles on first call, which would land on the first physics step of every
+# worker process. The kernels are compiled with cache=True, so the machine code is
+# written to __pycache__ once and later processes just load it; warm_up() forces
+# compile/load up front for the common dtypes.
+
+
+class NumpyKernels:
+    name = "numpy"
+
+    # Forward Euler, in place: v += dt * F / m; p += dt * v, on rows where movable
+    @staticmethod
+    def integrate(positions, velocities, forces, masses, movable, dt):
+        accel = forces[movable] / masses[movable, np.newaxis]
+        velocities[movable] += dt * accel
+        positions[movable] += dt * velocities[movable]
+
+    # Troposphere air density at altitudes h (formula of AirResistanceApplicator.rho)
+    @staticmethod
+    def air_density(h, p0, L, T0, g0, R_E, M, R):
+        g = g0 * (R_E / (R_E + h)) ** 2
+        p = p0 * (1 - L * h / T0) ** (g * M / (R * L))
+        return p * M / (R * (T0 - L * h))
+
+    # Which sweep candidates (already overlapping on x) also overlap on y and z: box
+    # centers and half extents (k, 3) for both sides, period (3,) the domain size per
+    # axis for minimum-image separations, 0 on axes that don't wrap
+    @staticmethod
+    def sweep_overlap(center_a, half_a, center_b, half_b, period):
+        delta = center_b[:, 1:] - center_a[:, 1:]
+        size = period[1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            wrapped = delta - size * np.round(delta / size)
+        delta = np.where(size > 0, wrapped, delta)
+
+        reach = half_a[:, 1:] + half_b[:, 1:]
+        return np.all(np.abs(delta) <= reach, axis=1)
+
+    # Which candidate pairs are really touching, with the same tests as does_collide
+    # (sphere/sphere: center distance < sum of radii; sphere/box: closest box point
+    # closer than the radius). Box/box pairs are always let through, so does_collide
+    # reports the missing box/box narrowphase just like without kernels. b positions
+    # should already be the nearest image. Slightly conservative (slack), so rounding
+    # can only let an extra pair through to does_collide.
+    @staticmethod
+    def touching(pos_a, half_a, sphere_a, pos_b, half_b, sphere_b, slack):
+        # Put the sphere first, like does_collide's double dispatch
+        swap = ~sphere_a & sphere_b
+        s_pos = np.where(swap[:, np.newaxis], pos_b, pos_a)
+        s_rad = np.where(swap, half_b[:, 0], half_a[:, 0])
+        o_pos = np.where(swap[:, np.newaxis], pos_a, pos_b)
+        o_half = np.where(swap[:, np.newaxis], half_a, half_b)
+        o_sphere = np.where(swap, sphere_a, sphere_b)
+
+        # sphere/sphere
+        d = o_pos - s_pos
+        dist2 = np.einsum("ij,ij->i", d, d)
+        reach = s_rad + o_half[:, 0]
+        sphere_hit = dist2 <= reach * reach * (1 + slack)
+
+        # sphere/box
+        closest = np.clip(s_pos, o_pos - o_half, o_pos + o_half)
+        e = closest - s_pos
+        box_dist2 = np.einsum("ij,ij->i", e, e)
+        box_hit = box_dist2 <= s_rad * s_rad * (1 + slack)
+
+        is_sphere = sphere_a | sphere_b
+        return ~is_sphere | np.where(o_sphere, sphere_hit, box_hit)
+
+
+if numba is not None:
+    _jit = numba.njit(cache=True, nogil=True)
+
+    @_jit
+    def _integrate_numba(positions, velocities, forces, masses, movable, dt):
+        for i in range(positions.shape[0]):
+            if not movable[i]:
+                continue
+            for k in range(3):
+                velocities[i, k] += dt * (forces[i, k] / masses[i])
+                positions[i, k] += dt * velocities[i, k]
+
+    @_jit
+    def _air_density_numba(h, p0, L, T0, g0, R_E, M, R):
+        out = np.empty_like(h)
+        for i in range(h.shape[0]):
+            g = g0 * (R_E / (R_E + h[i])) ** 2
+            p = p0 * (1 - L * h[i] / T0) ** (g * M / (R * L))
+            out[i] = p * M / (R * (T0 - L * h[i]))
+        return out
+
+    @_jit
+    def _sweep_overlap_numba(center_a, half_a, center_b, half_b, period):
+        out = np.ones(center_a.shape[0], dtype=np.bool_)
+        for i in range(center_a.shape[0]):
+            for k in range(1, 3):
+                d = center_b[i, k] - center_a[i, k]
+                if period[k] > 0:
+                    d = d - period[k] * np.round(d / period[k])
+                if abs(d) > half_a[i, k] + half_b[i, k]:
+                    out[i] = False
+                    break
+        return out
+
+    @_jit
+    def _touching_numba(pos_a, half_a, sphere_a, pos_b, half_b, sphere_b, slack):
+        out = np.ones(pos_a.shape[0], dtype=np.bool_)
+        for i in range(pos_a.shape[0]):
+            if not (sphere_a[i] or sphere_b[i]):
+                continue
+
+            if sphere_a[i]:
+                s_pos, s_rad = pos_a[i], half_a[i, 0]
+                o_pos, o_half, o_sphere = pos_b[i], half_b[i], sphere_b[i]
+            else:
+                s_pos, s_rad = pos_b[i], half_b[i, 0]
+                o_pos, o_half, o_sphere = pos_a[i], half_a[i], sphere_a[i]
+
+            dist2 = 0.0
+            if o_sphere:
+                for k in range(3):
+                    d = o_pos[k] - s_pos[k]
+                    dist2 += d * d
+                reach = s_rad + o_half[0]
+                out[i] = dist2 <= reach * reach * (1 + slack)
+            else:
+                for k in range(3):
+                    c = min(max(s_pos[k], o_pos[k] - o_half[k]), o_pos[k] + o_half[k])
+                    e = c - s_pos[k]
+                    dist2 += e * e
+                out[i] = dist2 <= s_rad * s_rad * (1 + slack)
+        return out
+
+    class NumbaKernels:
+        name = "numba"
+
+        @staticmethod
+        def integrate(positions, velocities, forces, masses, movable, dt):
+            _integrate_numba(positions, velocities, forces, masses, movable, dt)
+
+        @staticmethod
+        def air_density(h, p0, L, T0, g0, R_E, M, R):
+            h = np.asarray(h)
+            rho = _air_density_numba(h.ravel(), p0, L, T0, g0, R_E, M, R)
+            return rho.reshape(h.shape)
+
+        @staticmethod
+        def sweep_overlap(center_a, half_a, center_b, half_b, period):
+            return _sweep_overlap_numba(
+                np.ascontiguousarray(center_a, dtype=np.float64),
+                np.ascontiguousarray(half_a, dtype=np.float64),
+                np.ascontiguousarray(center_b, dtype=np.float64),
+                np.ascontiguousarray(half_b, dtype=np.float64),
+                np.asarray(period, dtype=np.float64),
+            )
+
+        @staticmethod
+        def touching(pos_a, half_a, sphere_a, pos_b, half_b, sphere_b, slack):
+            # One compiled signature per float type, so both sides have to agree
+            dtype = np.result_type(pos_a, half_a, pos_b, half_b)
+            return _touching_numba(
+                np.ascontiguousarray(pos_a, dtype=dtype),
+                np.ascontiguousarray(half_a, dtype=dtype),
+                sphere_a,
+                np.ascontiguousarray(pos_b, dtype=dtype),
+                np.ascontiguousarray(half_b, dtype=dtype),
+                sphere_b,
+                slack,
+            )
+
+else:
+    NumbaKernels = None
+
+
+# Kernel backend by name: "numpy", "numba", or "auto" (numba if installed)
+def get_kernels(name="auto"):
+    if name == "numpy":
+        return NumpyKernels
+
+    if name == "numba":
+        if NumbaKernels is None:
+            raise UserWarning(
+                "Kernels: numba backend requested, but numba isn't installed."
+            )
+        return NumbaKernels
+
+    if name == "auto":
+        return NumbaKernels if NumbaKernels is not None else NumpyKernels
+
+    raise UserWarning(f"Kernels: unknown kernel backend '{name}'.")
+
+
+# Compile (or load from the on-disk cache) every kernel for float32 and float64 state
+def warm_up(kernels=None):
+    if kernels is None:
+        kernels = get_kernels()
+
+    for dtype in (np.float32, np.float64):
+        p = np.zeros((1, 3), dtype=dtype)
+        v = np.zeros((1, 3), dtype=dtype)
+        f = np.zeros((1, 3), dtype=np.float64)
+        m = np.ones(1, dtype=np.float64)
+        movable = np.ones(1, dtype=bool)
+
+        kernels.integrate(p, v, f, m, movable, dtype(0.0))
+        atmosphere = (101325, 0.0065, 288.15, 9.80665, 6.3781e6, 0.0289652, 8.31445)
+        kernels.air_density(np.zeros(1, dtype=dtype), *atmosphere)
+        kernels.touching(p, p + 1, movable, p, p + 1, movable, 1e-9)
+
+    # The broadphase always works in float64
+    boxes = np.zeros((1, 3))
+    kernels.sweep_overlap(boxes, boxes, boxes, boxes, np.zeros(3))
@@ -0,0 +1,64 @@
+import os
+
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+# Opt-in multi-core backend for the vectorized parts of a step
+# Splits work over index ranges of bodies and runs the chunks on a thread pool. Threads
+# only pay off when the chunks are big NumPy (or compiled) kernels, which release the
+# GIL: MutualGravity, AirResistanceApplicator and FieldForceApplicator split their
+# bodies over it, and the engine splits fused integration and the batched contact test.
+# Pure-Python work (gathering body state, solving contacts) stays on one thread. Chunk
+# results are always handed back in chunk order so reductions don't depend on
+# scheduling, and a run with N workers is bit-identical to a run with 1.
+#
+# benchmarks/parallel.py has a 1..N core scaling benchmark.
+class ParallelBackend:
+    # Number of worker threads
+    _workers: int
+
+    # Smallest chunk worth sending to another thread
+    _min_chunk: int
+
+    # Thread pool, None when running on a single worker
+    _pool: ThreadPoolExecutor = None
+
+    def __init__(self, workers=None, min_chunk=256):
+        if workers is None or workers == "auto":
+            workers = os.cpu_count() or 1
+
+        if workers < 1:
+            raise UserWarning("ParallelBackend: need at least one worker.")
+
+        self._workers = workers
+        self._min_chunk = min_chunk
+
+        if workers > 1:
+            self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    @property
+    def workers(self):
+        return self._workers
+
+    # Split range(n) into at most one chunk per worker, each min_chunk long if n allows
+    def chunks(self, n):
+        n_chunks = max(1, min(self._workers, n // max(self._min_chunk, 1)))
+        bounds = np.linspace(0, n, n_chunks + 1).astype(int)
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    # Run fn(start, stop) over chunks of range(n), returns the results in chunk order
+    def map_chunks(self, fn, n):
+        chunks = self.chunks(n)
+
+        if self._pool is None or len(chunks) == 1:
+            return [fn(start, stop) for start, stop in chunks]
+
+        futures = [self._pool.submit(fn, start, stop) for start, stop in chunks]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -20,10 +20,14 @@ PhysicalPrimitiveType = IntEnum(
         "SPHERE",
         "BOX",
     ],
+    qualname="PhysicalPrimitiveType",  # so bodies can be pickled
 )
 
 
 class PhysicalMixin:
+    # No per-instance state, so slotted subclasses (CompactBodies) stay __dict__-free
+    __slots__ = ()
+
     # Mass, kg
     _mass: float
 
@@ -173,7 +177,19 @@ class PhysicalMixin:
         return self._net_force
 
     def pop_force(self):
-        self._net_force = np.array([0.0, 0.0, 0.0])
+        self._net_force = np.zeros(3, dtype=self._net_force.dtype)
+
+    # Store the state vectors as `dtype` (e.g. np.float32 to halve their data), with
+    # the net force accumulated in `accumulate_dtype` (defaults to dtype), so later math
+    # stays in that type
+    def set_state_dtype(self, dtype, accumulate_dtype=None):
+        if accumulate_dtype is None:
+            accumulate_dtype = dtype
+
+        self._position = np.asarray(self._position, dtype=dtype)
+        self._prev_position = np.asarray(self._prev_position, dtype=dtype)
+        self._velocity = np.asarray(self._velocity, dtype=dtype)
+        self._net_force = np.asarray(self._net_force, dtype=accumulate_dtype)
 
     # Cross-sectional area normal to the velocity
     # Used for drag
@@ -1,8 +1,24 @@
 from math import isclose
+from collections import deque
+import hashlib
 
-from PhysicalMixin import PhysicalMixin
+import numpy as np
+
+from PhysicalMixin import PhysicalMixin, PhysicalPrimitiveType
+from CompactBodies import CompactSphere, CompactBox
 from IForceApplicator import IForceApplicator
-from Collision import does_collide, could_collide
+from Collision import (
+    does_collide,
+    aabb_arrays,
+    half_extents,
+    ShapeProxy,
+    sweep_spheres,
+    sweep_boxes,
+)
+from Broadphase import SweepAndPrune
+from ParallelBackend import ParallelBackend
+from ContactCache import ContactCache
+from Kernels import get_kernels
 
 
 """
@@ -25,13 +41,154 @@ class PhysicsEngine:
     # References to objects in the world
     _objects: list = None
 
+    # Stable handle of each index of _objects (indices change on removal, handles don't)
+    _handles: list = None
+
+    # handle -> current index into _objects
+    _index_of: dict = None
+
+    # id(object) -> handle, so objects can be removed by reference
+    _handle_of_id: dict = None
+
+    # Next handle to hand out
+    _next_handle: int
+
+    # Callbacks run as listener(old_index, new_index) whenever removal moves an object
+    # to another index, and as listener(index, None) for the removed object itself.
+    # Anything that caches indices into _objects (broadphase structures, contact caches,
+    # ...) hooks in here.
+    _index_listeners: list = None
+
     # Coefficient of restitution for all collisions in the world
     _coeff_restitution: float
 
+    # World bounds, (min corner, max corner) numpy vectors, or None for unbounded
+    _bounds: tuple = None
+
+    # What happens at the world bounds:
+    #   "reflect"  - walls, objects bounce back in (with the world's coefficient of
+    #                restitution)
+    #   "periodic" - wrap-around, objects leaving one side come back in through the
+    #                opposite side
+    #   "despawn"  - objects whose center leaves the bounds are removed from the world
+    _bounds_mode: str = None
+
+    # Candidate pair finder for collisions, also backs the spatial queries
+    _broadphase: SweepAndPrune = None
+
+    # Set when objects appeared/disappeared since the broadphase was last rebuilt
+    _broadphase_stale: bool = True
+
+    # True while iterate is moving objects (collisions, forces, integration). Only then
+    # is the broadphase trusted as is; outside of a step anyone may have moved an
+    # object, so queries rebuild it every call
+    _in_step: bool = False
+
+    # Number of completed iterations
+    _step: int = 0
+
+    # Number of collision contacts resolved so far (counted even when not recording)
+    _contact_count: int = 0
+
+    # Deterministic mode (see _apply_collisions_deterministic)
+    _deterministic: bool = False
+
+    # Cap on rewind iterations per contact in deterministic mode (an object at rest
+    # can't rewind out)
+    _max_rewinds: int = 1000
+
+    # Floating point type of every object's position/velocity (e.g. np.float32 to halve
+    # the size of the vectorized kernels' temporaries; per-body memory is mostly Python
+    # object overhead and only shrinks ~5%), and of the net force accumulators (e.g.
+    # np.float64 for mixed precision)
+    _dtype: type = np.float64
+    _accumulate_dtype: type = np.float64
+
+    # Narrowphase result cache (contact_cache=tolerance), None for no cache
+    _contact_cache: ContactCache = None
+
+    # Fused kernels (kernels="numpy"/"numba"/"auto", see Kernels), None to not use them
+    # With kernels, integration runs over all objects at once (visitors run after the
+    # whole world moved), the broadphase filters its sweep candidates in one kernel, and
+    # a batched contact test weeds out broadphase pairs that don't touch before
+    # does_collide
+    _kernels = None
+
+    # Continuous collision detection (ccd=fraction), None for discrete collisions only
+    # Spheres moving more than this fraction of their radius in one step are swept along
+    # their path against everything their swept bounding box touches, and stopped just
+    # inside the first thing they hit, so the collision pass picks the contact up next
+    # step instead of the sphere tunneling through it
+    _ccd: float = None
+
+    # How far past the time of impact swept spheres are placed, as a fraction of their
+    # radius
+    _ccd_skin: float = 1e-3
+
+    # Multi-core backend (workers=N), None for single-core
+    # Handed to the force applicators (MutualGravity, AirResistanceApplicator and
+    # FieldForceApplicator split their NumPy math over it), and used for the fused
+    # integration and batched contact test when kernels are on. Only work that releases
+    # the GIL gains anything: gathering state from the objects and solving contacts are
+    # pure Python and always run on the calling thread.
+    _backend: ParallelBackend = None
+
+    # World-level visitors, [fn, every, contacts] lists. fn(state, contacts, dt) runs
+    # once every `every` steps with the whole world's state arrays (see state_arrays)
+    # and the contacts recorded since its own last call, which pile up in its own queue
+    # (None if contacts aren't being recorded)
+    _world_visitors: list = None
+
+    # Queue of collision contacts as
+    # (step, handle a, handle b, impulse on a, impulse on b, depth) tuples, None if
+    # contacts aren't being recorded. Bounded, oldest contacts are dropped once it's
+    # full.
+    _contacts: deque = None
+
     def __init__(self, **kwargs):
         self._objects = []
         self._force_applicators = []
 
+        self._handles = []
+        self._index_of = {}
+        self._handle_of_id = {}
+        self._next_handle = 0
+        self._index_listeners = []
+        self._world_visitors = []
+
+        if "deterministic" in kwargs:
+            self._deterministic = kwargs["deterministic"]
+
+        if "dtype" in kwargs:
+            self._dtype = np.dtype(kwargs["dtype"]).type
+            self._accumulate_dtype = self._dtype
+
+        if "accumulate_dtype" in kwargs:
+            self._accumulate_dtype = np.dtype(kwargs["accumulate_dtype"]).type
+
+        if "kernels" in kwargs and kwargs["kernels"] is not None:
+            self._kernels = get_kernels(kwargs["kernels"])
+
+        if "ccd" in kwargs and kwargs["ccd"] is not None:
+            if kwargs["ccd"] < 0:
+                raise UserWarning("ccd: the displacement threshold can't be negative.")
+
+            self._ccd = kwargs["ccd"]
+
+        if "contact_cache" in kwargs and kwargs["contact_cache"] is not None:
+            self._contact_cache = ContactCache(kwargs["contact_cache"])
+
+        if "workers" in kwargs and kwargs["workers"] != 1:
+            self._backend = ParallelBackend(workers=kwargs["workers"])
+
+        # Contact events are opt-in, record_contacts=True (or a max queue length)
+        if "record_contacts" in kwargs and kwargs["record_contacts"]:
+            max_contacts = kwargs["record_contacts"]
+            if max_contacts is True:
+                max_contacts = 100000
+
+            self._contacts = deque(maxlen=max_contacts)
+
         if "coeff_restitution" in kwargs:
             self._coeff_restitution = kwargs["coeff_restitution"]
         else:
@@ -42,6 +199,33 @@ class PhysicsEngine:
         else:
             self._do_collisions = False
 
+        # World bounds, enforced in one vectorized pass after integration instead of
+        # wall objects
+        if "bounds" in kwargs and kwargs["bounds"] is not None:
+            lo, hi = kwargs["bounds"]
+            self._bounds = (
+                np.asarray(lo, dtype=self._dtype),
+                np.asarray(hi, dtype=self._dtype),
+            )
+
+            if np.any(self._bounds[1] <= self._bounds[0]):
+                raise UserWarning(
+                    "World bounds need min corner < max corner on every axis."
+                )
+
+            if "bounds_mode" in kwargs:
+                self._bounds_mode = kwargs["bounds_mode"]
+            else:
+                self._bounds_mode = "reflect"
+
+            if self._bounds_mode not in ("reflect", "periodic", "despawn"):
+                raise UserWarning(f"Unknown world bounds mode '{self._bounds_mode}'.")
+
+        if self._bounds_mode == "periodic":
+            self._broadphase = SweepAndPrune(period=self._bounds, kernels=self._kernels)
+        else:
+            self._broadphase = SweepAndPrune(kernels=self._kernels)
+
     # Add a global force applicator
     # This should be applied in order that forces should be calculated (which really shouldn't matter- net force and all that)
     def add_force_applicator(self, force_applicator):
@@ -50,10 +234,32 @@ class PhysicsEngine:
         #        "Got a force applicator that wasn't derived from force applicator base class."
         #    )
 
+        if self._backend is not None and hasattr(force_applicator, "set_backend"):
+            force_applicator.set_backend(self._backend)
+
+        if hasattr(force_applicator, "set_dtype"):
+            force_applicator.set_dtype(self._dtype)
+
+        if self._kernels is not None and hasattr(force_applicator, "set_kernels"):
+            force_applicator.set_kernels(self._kernels)
+
         self._force_applicators.append(force_applicator)
 
     # Iterate for dt. Designed in such a way that this whole process is parallelizable & vertically scalable with more cores.
     def iterate(self, dt):
+        # Same type as the state, so dt * velocity doesn't upcast float32 state
+        dt = self._dtype(dt)
+
+        self._in_step = True
+        try:
+            self._advance(dt)
+        finally:
+            self._in_step = False
+
+        self._run_world_visitors(dt)
+
+    # Everything in a step but the world visitors
+    def _advance(self, dt):
         # Sweep through force applicators (incl collision applicator), adding a net force for this dt to each object (O(k*n))
         # optimization: this is parallelizable (independent objects for at least gravity and such)
         # print('position before collisions =', obj.position)
@@ -61,9 +267,34 @@ class PhysicsEngine:
         # print('position after collisions =', obj.position)
         # print()
 
+        # Deterministic mode hands applicators the objects in handle order, so their
+        # sums run in a fixed order
+        objects = self._canonical_objects() if self._deterministic else self._objects
+
         for force_applicator in self._force_applicators:
-            force_applicator.apply_forces(self._objects, dt)
+            force_applicator.apply_forces(objects, dt)
+
+        ccd_start = None
+        if self._ccd is not None and len(self._objects) > 0:
+            ccd_start = np.array(
+                [obj.position for obj in self._objects], dtype=self._dtype
+            )
+
+        if self._kernels is not None:
+            self._integrate_fused(dt)
+        else:
+            self._integrate_objects(dt)
+
+        if ccd_start is not None:
+            self._sweep_fast_spheres(ccd_start)
 
+        if self._bounds is not None:
+            self.enforce_bounds()
+
+        self._broadphase_stale = True
+        self._step += 1
+
+    def _integrate_objects(self, dt):
         # Apply the forces for each object (O(n)) as some movement
         # forward euler for now
         for obj in self:
@@ -126,6 +357,255 @@ class PhysicsEngine:
             obj.pop_force()  # clear accumulated net force
             obj.on_update(dt)
 
+    # Same forward Euler as _integrate_objects, as one fused kernel over every object
+    def _integrate_fused(self, dt):
+        objects = self._objects
+        if len(objects) == 0:
+            return
+
+        positions = np.array([obj.position for obj in objects], dtype=self._dtype)
+        velocities = np.array([obj.velocity for obj in objects], dtype=self._dtype)
+        forces = np.array(
+            [obj.net_force for obj in objects], dtype=self._accumulate_dtype
+        )
+        masses = np.array([obj.mass for obj in objects], dtype=self._accumulate_dtype)
+        movable = np.array([not obj.immovable for obj in objects], dtype=bool)
+
+        def chunk(start, stop):
+            rows = slice(start, stop)
+            self._kernels.integrate(
+                positions[rows],
+                velocities[rows],
+                forces[rows],
+                masses[rows],
+                movable[rows],
+                dt,
+            )
+
+        self._map_chunks(chunk, len(objects))
+
+        for i, obj in enumerate(objects):
+            if movable[i]:
+                # must be done pre next-frame-movement-update, see _integrate_objects
+                obj.update_average_movement()
+                obj.velocity = velocities[i]
+                obj.position = positions[i]
+
+            obj.pop_force()  # clear accumulated net force
+
+        for obj in objects:
+            obj.on_update(dt)
+
+    # Continuous collision detection, after integration (start: positions before it)
+    # Every object is swept from start to its current position; spheres that moved more
+    # than _ccd of their radius are checked along that path against everything they
+    # passed by, and pulled back to their first time of impact (plus a small skin, so
+    # the shapes overlap and the next collision pass resolves the contact)
+    def _sweep_fast_spheres(self, start):
+        objects = self._objects
+
+        end = np.array([obj.position for obj in objects], dtype=self._dtype)
+        moved = end - start
+
+        half = np.array([half_extents(obj) for obj in objects], dtype=self._dtype)
+        is_sphere = np.array(
+            [
+                obj.physical_primitive_type == PhysicalPrimitiveType.SPHERE
+                for obj in objects
+            ]
+        )
+        movable = np.array([not (obj.immovable or obj.static) for obj in objects])
+
+        fast = (
+            is_sphere
+            & movable
+            & (np.linalg.norm(moved, axis=1) > self._ccd * half[:, 0])
+        )
+        if not fast.any():
+            return
+
+        # Pairs whose swept bounding boxes overlap, at least one of them a fast sphere
+        self._broadphase.update(
+            np.minimum(start, end) - half, np.maximum(start, end) + half
+        )
+        pairs = self._broadphase.pairs()
+        if len(pairs) == 0:
+            return
+
+        pairs = pairs[fast[pairs[:, 0]] | fast[pairs[:, 1]]]
+        swap = ~fast[pairs[:, 0]]
+        pairs[swap] = pairs[swap][:, ::-1]
+        a, b = pairs[:, 0], pairs[:, 1]
+
+        # In b's frame: a's start relative to b's, and a's displacement relative to b's
+        m = self._broadphase.minimum_image(start[a] - start[b])
+        d = moved[a] - moved[b]
+
+        toi = np.full(len(pairs), np.inf, dtype=self._dtype)
+
+        spheres = is_sphere[b]
+        if spheres.any():
+            toi[spheres] = sweep_spheres(
+                m[spheres], d[spheres], half[a[spheres], 0] + half[b[spheres], 0]
+            )
+        if (~spheres).any():
+            toi[~spheres] = sweep_boxes(
+                m[~spheres], d[~spheres], half[a[~spheres], 0], half[b[~spheres]]
+            )
+
+        hit = np.isfinite(toi)
+        if not hit.any():
+            return
+
+        a, b, toi, d = a[hit], b[hit], toi[hit], d[hit]
+        toi = np.minimum(
+            toi + self._ccd_skin * half[a, 0] / np.linalg.norm(d, axis=1), 1
+        )
+
+        # Every fast sphere stops at its earliest impact (min is order-independent, so
+        # deterministic too)
+        stop = np.ones(len(objects), dtype=self._dtype)
+        np.minimum.at(stop, a, toi)
+        np.minimum.at(stop, b[fast[b]], toi[fast[b]])
+
+        for i in np.flatnonzero(stop < 1):
+            objects[i].position = start[i] + stop[i] * moved[i]
+
+    # Add a world-level visitor, fn(state, contacts, dt), run once every `every` steps
+    # Cheaper than per-object visitors for anything that works on the world as a whole:
+    # one Python call per run, with state_arrays() for the state and the contacts since
+    # its last run (same arrays as drain_contacts, but every visitor gets all of them
+    # whatever the other visitors and drain_contacts see)
+    def add_world_visitor(self, fn, every=1):
+        if every < 1:
+            raise UserWarning("World visitors must run at least every 1 step.")
+
+        contacts = None
+        if self._contacts is not None:
+            contacts = deque(maxlen=self._contacts.maxlen)
+
+        self._world_visitors.append([fn, every, contacts])
+        return self
+
+    def _run_world_visitors(self, dt):
+        due = [v for v in self._world_visitors if self._step % v[1] == 0]
+        if not due:
+            return
+
+        state = self.state_arrays()
+
+        for fn, _, contacts in due:
+            fn(state, self._pop_contacts(contacts), dt)
+
+    # Queue a contact for drain_contacts and for every world visitor
+    def _record_contact(self, contact):
+        self._contacts.append(contact)
+
+        for _, _, contacts in self._world_visitors:
+            contacts.append(contact)
+
+    # Snapshot of the world state as arrays, one row per object in index order
+    def state_arrays(self):
+        return {
+            "step": self._step,
+            "handles": self.handles,
+            "positions": np.array(
+                [obj.position for obj in self._objects], dtype=self._dtype
+            ).reshape(-1, 3),
+            "velocities": np.array(
+                [obj.velocity for obj in self._objects], dtype=self._dtype
+            ).reshape(-1, 3),
+            "masses": np.array([obj.mass for obj in self._objects], dtype=float),
+        }
+
+    # Pop every queued contact as arrays: step (k,), a/b handles (k,),
+    # impulse on a (k, 3), impulse on b (k, 3), depth (k,).
+    # Empty arrays when contacts aren't being recorded.
+    # The two impulses aren't simply opposite: the solver flips the x velocity of both
+    # bodies, and an immovable body's impulse is always zero.
+    def drain_contacts(self):
+        return self._pop_contacts(self._contacts)
+
+    # Empty a contact queue (or None) into arrays, see drain_contacts
+    @staticmethod
+    def _pop_contacts(queue):
+        contacts = list(queue) if queue is not None else []
+        if queue is not None:
+            queue.clear()
+
+        return {
+            "step": np.array([c[0] for c in contacts], dtype=int),
+            "a": np.array([c[1] for c in contacts], dtype=int),
+            "b": np.array([c[2] for c in contacts], dtype=int),
+            "impulse": np.array([c[3] for c in contacts], dtype=float).reshape(-1, 3),
+            "impulse_b": np.array([c[4] for c in contacts], dtype=float).reshape(-1, 3),
+            "depth": np.array([c[5] for c in contacts], dtype=float),
+        }
+
+    # Current step count
+    @property
+    def step(self):
+        return self._step
+
+    # Collision contacts resolved since the engine was created
+    @property
+    def contact_count(self):
+        return self._contact_count
+
+    # Stop the parallel backend's worker threads (if any)
+    def shutdown(self):
+        if self._backend is not None:
+            self._backend.shutdown()
+
+    # Apply the world bounds to every object at once (see _bounds_mode)
+    def enforce_bounds(self):
+        if len(self._objects) == 0:
+            return
+
+        lo, hi = self._bounds
+        positions = np.array([obj.position for obj in self._objects], dtype=self._dtype)
+
+        if self._bounds_mode == "despawn":
+            outside = np.any((positions < lo) | (positions > hi), axis=1)
+            if outside.any():
+                self.remove_where(outside)
+            return
+
+        if self._bounds_mode == "periodic":
+            wrapped = lo + np.mod(positions - lo, hi - lo)
+            changed = np.flatnonzero(np.any(wrapped != positions, axis=1))
+
+            for i in changed:
+                self._objects[i].position = wrapped[i]
+            return
+
+        # reflect: keep the whole body inside, mirror the overshoot back in and send it
+        # back inwards
+        half = np.array([half_extents(obj) for obj in self._objects], dtype=self._dtype)
+        inner_lo = lo + half
+        inner_hi = hi - half
+
+        below = positions < inner_lo
+        above = positions > inner_hi
+        changed = np.flatnonzero(np.any(below | above, axis=1))
+
+        if len(changed) == 0:
+            return
+
+        reflected = np.where(below, 2 * inner_lo - positions, positions)
+        reflected = np.where(above, 2 * inner_hi - reflected, reflected)
+        # Overshoot of more than the whole domain (huge dt), just clamp
+        reflected = np.clip(reflected, inner_lo, np.maximum(inner_lo, inner_hi))
+
+        for i in changed:
+            obj = self._objects[i]
+            obj.position = reflected[i]
+
+            velocity = np.array(obj.velocity, dtype=self._dtype)
+            velocity[below[i]] = self._coeff_restitution * np.abs(velocity[below[i]])
+            velocity[above[i]] = -self._coeff_restitution * np.abs(velocity[above[i]])
+            obj.velocity = velocity
+
     def register_object(self, physical_object):
         if not isinstance(physical_object, PhysicalMixin):
             raise UserWarning(
@@ -133,137 +613,747 @@ class PhysicsEngine:
             )
 
         # push a reference
-        self._objects.append(physical_object)
+        self._push(physical_object)
 
         # Allow for chaining
         return self
 
+    # Create and register N headless bodies (CompactSphere/CompactBox), returns handles
+    # positions: (n, 3). velocities: (n, 3), default at rest.
+    # masses: (n,) or scalar, default 1.
+    # shapes: PhysicalPrimitiveType (or array of them), default spheres.
+    # radii: (n,) or scalar, sphere radii. sizes: (n, 3) or (3,), box sizes.
+    # Any other kwargs (static, immovable, visitor, ...) are passed to every body.
+    def register_many(
+        self,
+        positions,
+        velocities=None,
+        masses=None,
+        shapes=PhysicalPrimitiveType.SPHERE,
+        radii=None,
+        sizes=None,
+        **kwargs,
+    ):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        n = len(positions)
+
+        if velocities is None:
+            velocities = np.zeros((n, 3))
+        velocities = np.broadcast_to(np.asarray(velocities, dtype=float), (n, 3))
+
+        if masses is None:
+            masses = 1.0
+        masses = np.broadcast_to(np.asarray(masses, dtype=float), (n,))
+
+        shapes = np.broadcast_to(np.asarray(shapes), (n,))
+
+        if radii is None:
+            radii = 1.0
+        radii = np.broadcast_to(np.asarray(radii, dtype=float), (n,))
+
+        if sizes is None:
+            sizes = [1.0, 1.0, 1.0]
+        sizes = np.broadcast_to(np.asarray(sizes, dtype=float), (n, 3))
+
+        if np.any(masses < 0):
+            raise UserWarning(
+                "Negative mass detected; sorry, but no Alcubierre drives are allowed"
+                " in this universe!"
+            )
+
+        bodies = []
+        for i in range(n):
+            if shapes[i] == PhysicalPrimitiveType.SPHERE:
+                body = CompactSphere(
+                    radius=float(radii[i]), mass=float(masses[i]), **kwargs
+                )
+            elif shapes[i] == PhysicalPrimitiveType.BOX:
+                body = CompactBox(size=sizes[i], mass=float(masses[i]), **kwargs)
+            else:
+                raise UserWarning(f"register_many: unknown shape {shapes[i]}.")
+
+            # Own copies, the inputs may be broadcast views
+            body.position = positions[i].copy()
+            body.velocity = velocities[i].copy()
+            bodies.append(body)
+
+        first_handle = self._next_handle
+        for body in bodies:
+            self._push(body)
+
+        return np.arange(first_handle, self._next_handle)
+
+    # Append an object, giving it the next handle
+    def _push(self, physical_object):
+        handle = self._next_handle
+        self._next_handle += 1
+
+        physical_object.set_state_dtype(self._dtype, self._accumulate_dtype)
+
+        self._index_of[handle] = len(self._objects)
+        self._handle_of_id[id(physical_object)] = handle
+        self._handles.append(handle)
+        self._objects.append(physical_object)
+        self._broadphase_stale = True
+
+        return handle
+
+    # Remove one object, given either its handle or the object itself. O(1): the last
+    # object is swapped into the freed index, so indices (not handles) of other objects
+    # may change.
+    def remove(self, handle_or_object):
+        if isinstance(handle_or_object, PhysicalMixin):
+            if id(handle_or_object) not in self._handle_of_id:
+                raise UserWarning("remove: object isn't registered with this engine.")
+            handle = self._handle_of_id[id(handle_or_object)]
+        else:
+            handle = int(handle_or_object)
+
+        if handle not in self._index_of:
+            raise UserWarning(f"remove: no object with handle {handle}.")
+
+        self._swap_remove(self._index_of[handle])
+
+        return self
+
+    # Remove every object whose entry in mask (bool array, one per current index) is set
+    # Returns the handles that were removed
+    def remove_where(self, mask):
+        mask = np.asarray(mask, dtype=bool)
+
+        if mask.shape != (len(self._objects),):
+            raise UserWarning("remove_where: mask must have one entry per object.")
+
+        indices = np.flatnonzero(mask)
+        removed = np.array([self._handles[i] for i in indices], dtype=int)
+
+        # Highest index first, so the object swapped in from the end is never one still
+        # pending removal
+        for index in indices[::-1]:
+            self._swap_remove(int(index))
+
+        return removed
+
+    def _swap_remove(self, index):
+        last = len(self._objects) - 1
+
+        removed_handle = self._handles[index]
+        del self._index_of[removed_handle]
+        del self._handle_of_id[id(self._objects[index])]
+
+        for listener in self._index_listeners:
+            listener(index, None)
+
+        if index != last:
+            moved = self._objects[last]
+            moved_handle = self._handles[last]
+
+            self._objects[index] = moved
+            self._handles[index] = moved_handle
+            self._index_of[moved_handle] = index
+
+            for listener in self._index_listeners:
+                listener(last, index)
+
+        self._objects.pop()
+        self._handles.pop()
+        self._broadphase_stale = True
+
+    # Register a callback for index changes caused by removal, see _index_listeners
+    def add_index_listener(self, listener):
+        self._index_listeners.append(listener)
+        return self
+
+    # Handle of an object (or of the object at an index)
+    def handle_of(self, index_or_object):
+        if isinstance(index_or_object, PhysicalMixin):
+            return self._handle_of_id[id(index_or_object)]
+
+        return self._handles[index_or_object]
+
+    # Current index of the object with a handle
+    def index_of(self, handle):
+        return self._index_of[handle]
+
+    # Object with a handle
+    def get(self, handle):
+        return self._objects[self._index_of[handle]]
+
     def apply_collisions(self, dt):
-        for a in range(len(self._objects)):
-            for b in range(a + 1, len(self._objects)):
-                aObj = self._objects[a]
-                bObj = self._objects[b]
+        # Only pairs with overlapping bounding boxes are worth looking at (O(n log n)
+        # vs. O(n^2))
+        self._refresh_broadphase(force=True)
+
+        if self._deterministic:
+            self._apply_collisions_deterministic(dt)
+            return
+
+        pairs = self._broadphase.pairs()
+        self._evict_contacts(pairs)
+        pairs = self._touching_pairs(pairs)
+
+        for a, b in pairs:
+            aObj = self._objects[a]
+            bObj = self._objects[b]
+
+            a_grounded = aObj.grounded or aObj.immovable or aObj.static
+            b_grounded = bObj.grounded or bObj.immovable or bObj.static
+
+            if a_grounded and b_grounded:
+                # print('Skipping because both grounded')
+                continue
+
+            if a_grounded:
+                pass
+                # print('a is grounded')
+
+            # Periodic worlds: resolve against the image of b nearest to a, then put b
+            # back after
+            image_shift = None
+            if self._broadphase.periodic:
+                d = bObj.position - aObj.position
+                image_shift = self._broadphase.minimum_image(d) - d
+
+                if np.any(image_shift != 0):
+                    bObj.position = bObj.position + image_shift
+                else:
+                    image_shift = None
+
+            # Broadphase already did the cheap could_collide check, so straight to the
+            # expensive one
+            possible_collision = self._narrowphase(a, b, aObj, bObj)
+
+            if possible_collision is not None:
+                # print('Collision found')
+                self._contact_count += 1
+
+                # Solve two-body linear collision, applying force to both objects
+                # ref: PHYS 0174
+                # and https://phys.libretexts.org/Courses/Muhlenberg_College/MC%3A_Physics_121_-_General_Physics_I/10%3A_Linear_Momentum_and_Collisions/10.08%3A_Collisions_in_Multiple_Dimensions
+
+                """Old inelastic equations
+                aObj_vel_f = (
+                    (aObj.mass - bObj.mass) * aObj.velocity
+                    + 2 * bObj.mass * bObj.velocity
+                ) / (aObj.mass + bObj.mass)
+
+                bObj_vel_f = (
+                    (bObj.mass - aObj.mass) * bObj.velocity
+                    + 2 * aObj.mass * aObj.velocity
+                ) / (aObj.mass + bObj.mass)
+                """
+
+                # New elastic equations
+                # ref: https://en.wikipedia.org/wiki/Coefficient_of_restitution#Speeds_after_impact
+                total_initial_momentum = (
+                    aObj.mass * aObj.velocity + bObj.mass * bObj.velocity
+                )
+                aObj_vel_f = (
+                    total_initial_momentum
+                    + bObj.mass
+                    * self._coeff_restitution
+                    * (bObj.velocity - aObj.velocity)
+                ) / (aObj.mass + bObj.mass)
+
+                bObj_vel_f = (
+                    total_initial_momentum
+                    + aObj.mass
+                    * self._coeff_restitution
+                    * (aObj.velocity - bObj.velocity)
+                ) / (aObj.mass + bObj.mass)
+
+                # Correct x vel
+                aObj_vel_f[0] = -aObj_vel_f[0]
+                bObj_vel_f[0] = -bObj_vel_f[0]
+
+                # Correct positions too
+                # basic idea: if(overlapping) { don't() }
+
+                # Rewind overlapping objects by a little bit more than one dt
+                # Kinda a hack but good enough
+                rewind_dt = 1.01 * dt
+
+                if (not a_grounded) and (not b_grounded):  # a and b can move
+                    while does_collide(aObj, bObj) is not None:
+                        aObj.position = aObj.position - rewind_dt / 2 * aObj.velocity
+                        bObj.position = bObj.position - rewind_dt / 2 * bObj.velocity
 
-                a_grounded = aObj.grounded or aObj.immovable or aObj.static
-                b_grounded = bObj.grounded or bObj.immovable or bObj.static
+                    # print('Ungrounding both')
+                    # aObj.grounded = False
+                    # bObj.grounded = False
+                elif a_grounded:  # -> just b can move, so b moves
+                    while does_collide(aObj, bObj) is not None:
+                        bObj.position = bObj.position - rewind_dt * bObj.velocity
 
-                if a_grounded and b_grounded:
-                    # print('Skipping because both grounded')
-                    continue
+                    # print('Ungrounding bObj')
+                    # bObj.grounded = False
+                elif b_grounded:  # -> just a can move, so a moves
+                    while does_collide(aObj, bObj) is not None:
+                        aObj.position = aObj.position - rewind_dt * aObj.velocity
 
-                if a_grounded:
+                    # print('Ungrounding aObj')
+                    # aObj.grounded = False
+                else:
+                    # print('oops two objects that are grounded just collided- undefined behavior; moving both')
                     pass
-                    # print('a is grounded')
-
-                # If the two objects *could* collide (cheap), then check if they actually do (expensive)
-                if not could_collide(aObj, bObj):
-                    # print(a, b, 'could not collide.')
-                    # print(aObj.position, bObj.position, 'could not collide.')
-                    continue
-
-                possible_collision = does_collide(aObj, bObj)
-
-                if possible_collision is not None:
-                    # print('Collision found')
-                    # Solve two-body linear collision, applying force to both objects
-                    # ref: PHYS 0174
-                    # and https://phys.libretexts.org/Courses/Muhlenberg_College/MC%3A_Physics_121_-_General_Physics_I/10%3A_Linear_Momentum_and_Collisions/10.08%3A_Collisions_in_Multiple_Dimensions
-
-                    """Old inelastic equations
-                    aObj_vel_f = (
-                        (aObj.mass - bObj.mass) * aObj.velocity
-                        + 2 * bObj.mass * bObj.velocity
-                    ) / (aObj.mass + bObj.mass)
-
-                    bObj_vel_f = (
-                        (bObj.mass - aObj.mass) * bObj.velocity
-                        + 2 * aObj.mass * aObj.velocity
-                    ) / (aObj.mass + bObj.mass)
-                    """
-
-                    # New elastic equations
-                    # ref: https://en.wikipedia.org/wiki/Coefficient_of_restitution#Speeds_after_impact
-                    total_initial_momentum = (
-                        aObj.mass * aObj.velocity + bObj.mass * bObj.velocity
+
+                a_vel_i = aObj.velocity
+                b_vel_i = bObj.velocity
+
+                aObj.velocity = aObj_vel_f
+                bObj.velocity = bObj_vel_f
+
+                # Impulses as actually applied (the velocity setter ignores immovable
+                # bodies)
+                if self._contacts is not None:
+                    self._record_contact(
+                        (
+                            self._step,
+                            self._handles[a],
+                            self._handles[b],
+                            aObj.mass * (aObj.velocity - a_vel_i),
+                            bObj.mass * (bObj.velocity - b_vel_i),
+                            possible_collision.depth,
+                        )
+                    )
+
+                # print('after collide: a, b vels = ', aObj_vel_f, bObj_vel_f)
+
+                """
+                bToa = possible_collision.aPos - possible_collision.bPos
+
+                # print('before a pos, b pos = ', aObj.position, bObj.position)
+                if (not a_grounded) and (not b_grounded): # a and b can move
+                    # * 1.05 for some nice leeway
+                    # in case of floating point errors causing the displacement not to be enough (and making a collision loop)
+                    aObj.position = aObj.position + (1.05 * bToa) / 2
+                    bObj.position = bObj.position - (1.05 * bToa) / 2
+                elif a_grounded: # -> just b can move, so b moves
+                    bObj.position = bObj.position - (1.05 * bToa)
+                elif b_grounded: # -> just a can move, so a moves
+                    aObj.position = aObj.position + (1.05 * bToa)
+                else:
+                    # print('oops two objects that are grounded just collided- undefined behavior; moving both')
+                    aObj.position = aObj.position + (1.05 * bToa) / 2
+                    bObj.position = bObj.position - (1.05 * bToa) / 2
+                """
+
+                # print('after  a pos, b pos = ', aObj.position, bObj.position)
+
+            if image_shift is not None:
+                bObj.position = bObj.position - image_shift
+
+    def _refresh_broadphase(self, force=False):
+        if force or self._broadphase_stale or not self._in_step:
+            self._broadphase.update(*aabb_arrays(self._objects))
+            self._broadphase_stale = False
+
+    # Spatial queries
+    # These reuse the collision broadphase. Outside of iterate (incl. world visitors)
+    # every call rebuilds it from the current positions, O(n log n), so objects moved by
+    # hand are always seen: batch queries into one call rather than calling once per
+    # query. During a step (e.g. from a per-object visitor) queries see bounding boxes
+    # as of the start of the step, refined with current positions. All take arrays of
+    # queries (or a single one) and return one index array per query.
+
+    # Objects whose bounding box overlaps each query box. lo, hi: (m, 3) min/max corners
+    def query_aabb(self, lo, hi):
+        self._refresh_broadphase()
+        return self._broadphase.query_aabb(lo, hi)
+
+    # Objects with any part within radius of each center
+    # centers: (m, 3), radii: (m,) or scalar
+    def query_radius(self, centers, radii):
+        centers = np.atleast_2d(np.asarray(centers, dtype=float))
+        radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(centers),))
+
+        candidates = self.query_aabb(
+            centers - radii[:, np.newaxis], centers + radii[:, np.newaxis]
+        )
+
+        results = []
+        for center, radius, cand in zip(centers, radii, candidates):
+            if len(cand) == 0:
+                results.append(cand)
+                continue
+
+            objs = [self._objects[i] for i in cand]
+            d = self._broadphase.minimum_image(
+                np.array([obj.position for obj in objs], dtype=float) - center
+            )
+            half = np.array([half_extents(obj) for obj in objs])
+            is_sphere = np.array(
+                [
+                    obj.physical_primitive_type == PhysicalPrimitiveType.SPHERE
+                    for obj in objs
+                ]
+            )
+
+            # spheres: center distance minus radius; boxes: distance to the closest
+            # point of the box
+            sphere_dist = np.linalg.norm(d, axis=1) - half[:, 0]
+            box_dist = np.linalg.norm(np.maximum(np.abs(d) - half, 0.0), axis=1)
+            dist = np.where(is_sphere, sphere_dist, box_dist)
+
+            results.append(cand[dist <= radius])
+
+        return results
+
+    # First object hit by each ray
+    # origins, directions: (m, 3); max_distance: (m,) or scalar
+    # Directions don't need to be normalized. Rays don't wrap around periodic bounds.
+    # Rays are walked in sub-segments of length `segment` (default 1/32 of the diagonal
+    # of the box around all objects), querying the broadphase for one sub-segment's
+    # bounding box at a time and stopping at the first hit, so a long diagonal ray only
+    # looks at the objects near it rather than most of the world.
+    # Returns per ray: (hit object index, -1 for a miss), (distance, inf for a miss)
+    def raycast(self, origins, directions, max_distance=np.inf, segment=None):
+        origins = np.atleast_2d(np.asarray(origins, dtype=float))
+        directions = np.atleast_2d(np.asarray(directions, dtype=float))
+        max_distance = np.broadcast_to(
+            np.asarray(max_distance, dtype=float), (len(origins),)
+        ).copy()
+
+        hits = np.full(len(origins), -1, dtype=int)
+        distances = np.full(len(origins), np.inf)
+
+        self._refresh_broadphase()
+        extent = self._broadphase.extent()
+        if extent is None:
+            return hits, distances
+
+        norms = np.linalg.norm(directions, axis=1)
+        if np.any(norms == 0):
+            raise UserWarning("raycast: ray directions can't be zero vectors.")
+        directions = directions / norms[:, np.newaxis]
+
+        if segment is None:
+            segment = np.linalg.norm(extent[1] - extent[0]) / 32
+        if segment <= 0:
+            # Everything sits at one point, one segment covers it
+            segment = np.inf
+
+        # Clip every ray to the box around all objects, rays missing it can't hit
+        # anything
+        t_enter, t_exit = _ray_box(origins, directions, *extent)
+        t_enter = np.maximum(t_enter, 0.0)
+        t_exit = np.minimum(t_exit, max_distance)
+
+        for r in np.flatnonzero(t_enter <= t_exit):
+            tested = np.zeros(0, dtype=int)
+            best, best_t = -1, np.inf
+
+            t0 = t_enter[r]
+            while True:
+                t1 = min(t0 + segment, t_exit[r])
+
+                a = origins[r] + t0 * directions[r]
+                b = origins[r] + t1 * directions[r]
+                box = np.minimum(a, b), np.maximum(a, b)
+                cand = self._broadphase.query_aabb(*box)[0]
+                cand = np.setdiff1d(cand, tested, assume_unique=True)
+
+                if len(cand) > 0:
+                    tested = np.union1d(tested, cand)
+                    t = self._ray_distances(origins[r], directions[r], cand)
+
+                    k = np.argmin(t)
+                    if t[k] < best_t:
+                        best, best_t = cand[k], t[k]
+
+                # Anything hit further along was found in an earlier segment or can't be
+                # closer
+                if best_t <= t1 or t1 >= t_exit[r]:
+                    break
+                t0 = t1
+
+            if best_t <= max_distance[r]:
+                hits[r] = best
+                distances[r] = best_t
+
+        return hits, distances
+
+    # Distance along a ray (origin, unit direction) to each object in cand, inf: miss
+    def _ray_distances(self, origin, direction, cand):
+        objs = [self._objects[i] for i in cand]
+        positions = np.array([obj.position for obj in objs], dtype=float)
+        half = np.array([half_extents(obj) for obj in objs])
+        is_sphere = np.array(
+            [
+                obj.physical_primitive_type == PhysicalPrimitiveType.SPHERE
+                for obj in objs
+            ]
+        )
+
+        o = np.broadcast_to(origin, positions.shape)
+        v = np.broadcast_to(direction, positions.shape)
+
+        # Boxes: slab test
+        box_enter, box_exit = _ray_box(o, v, positions - half, positions + half)
+        box_t = np.where(
+            box_exit >= np.maximum(box_enter, 0.0), np.maximum(box_enter, 0.0), np.inf
+        )
+
+        # Spheres: |o + t v - p|^2 = r^2, nearest non-negative root
+        m = origin - positions
+        b_half = m @ direction
+        c = np.einsum("ij,ij->i", m, m) - half[:, 0] ** 2
+        disc = b_half**2 - c
+        root = np.sqrt(np.maximum(disc, 0.0))
+        near = -b_half - root
+        far = -b_half + root
+        sphere_t = np.where(near >= 0, near, np.where(far >= 0, 0.0, np.inf))
+        sphere_t = np.where(disc >= 0, sphere_t, np.inf)
+
+        return np.where(is_sphere, sphere_t, box_t)
+
+    # does_collide for the objects at indices a and b, through the contact cache if any
+    def _narrowphase(self, a, b, aObj, bObj):
+        if self._contact_cache is None:
+            return does_collide(aObj, bObj)
+
+        return self._contact_cache.collide(
+            (self._handles[a], self._handles[b]), aObj, bObj
+        )
+
+    # Keep only the pairs that really touch, with the batched contact kernel (if any)
+    def _touching_pairs(self, pairs):
+        if self._kernels is None or len(pairs) == 0:
+            return pairs
+
+        objects = self._objects
+        positions = np.array([obj.position for obj in objects], dtype=self._dtype)
+        half = np.array([half_extents(obj) for obj in objects], dtype=self._dtype)
+        is_sphere = np.array(
+            [
+                obj.physical_primitive_type == PhysicalPrimitiveType.SPHERE
+                for obj in objects
+            ]
+        )
+
+        a, b = pairs[:, 0], pairs[:, 1]
+        pos_b = positions[a] + self._broadphase.minimum_image(
+            positions[b] - positions[a]
+        ).astype(self._dtype)
+
+        def chunk(start, stop):
+            i, j = a[start:stop], b[start:stop]
+            return self._kernels.touching(
+                positions[i],
+                half[i],
+                is_sphere[i],
+                pos_b[start:stop],
+                half[j],
+                is_sphere[j],
+                1e-6,
+            )
+
+        touching = np.concatenate(self._map_chunks(chunk, len(pairs)))
+        return pairs[touching]
+
+    # Run fn(start, stop) over chunks of range(n) on the backend (one chunk without
+    # one), returns the results in chunk order
+    # Only pays off for the compiled kernels, which run without the GIL
+    def _map_chunks(self, fn, n):
+        if self._backend is None:
+            return [fn(0, n)]
+
+        return self._backend.map_chunks(fn, n)
+
+    # Drop cached contacts for pairs the broadphase doesn't report anymore
+    def _evict_contacts(self, pairs):
+        if self._contact_cache is None:
+            return
+
+        self._contact_cache.evict_except(
+            (self._handles[a], self._handles[b]) for a, b in pairs
+        )
+
+    # Contact cache hit/miss/eviction counts (see ContactCache.stats), None if it's off
+    def contact_cache_stats(self):
+        if self._contact_cache is None:
+            return None
+
+        return self._contact_cache.stats()
+
+    # Objects sorted by handle, i.e. independent of registration/removal order
+    def _canonical_objects(self):
+        order = np.argsort(self._handles, kind="stable")
+        return [self._objects[i] for i in order]
+
+    # Broadphase pairs in canonical order: (lower handle, higher handle), sorted
+    def _canonical_pairs(self):
+        pairs = self._broadphase.pairs()
+        if len(pairs) == 0:
+            return pairs
+
+        handles = np.array(self._handles, dtype=int)
+        swap = handles[pairs[:, 0]] > handles[pairs[:, 1]]
+        pairs[swap] = pairs[swap][:, ::-1]
+
+        order = np.lexsort((handles[pairs[:, 1]], handles[pairs[:, 0]]))
+        return pairs[order]
+
+    # Index-order-independent version of the collision pass
+    # Every contact is solved against the velocities/positions from the start of the
+    # pass (never against another contact's result), its velocity change and rewind are
+    # accumulated, and all of it is applied at the end. Contacts are visited in
+    # canonical handle order and accumulated with np.add.at, so float sums always happen
+    # in the same order: the same world gives bit-identical results however removals
+    # have shuffled its objects' indices, and whatever the number of workers.
+    # Handles follow registration order, so registering the same bodies in another
+    # order changes the summation order too, and results only agree up to rounding.
+    def _apply_collisions_deterministic(self, dt):
+        pairs = self._canonical_pairs()
+        self._evict_contacts(pairs)
+        pairs = self._touching_pairs(pairs)
+
+        if len(pairs) == 0:
+            return
+
+        positions = np.array([obj.position for obj in self._objects], dtype=self._dtype)
+        velocities = np.array(
+            [obj.velocity for obj in self._objects], dtype=self._dtype
+        )
+
+        results = [self._solve_pair(a, b, positions, velocities, dt) for a, b in pairs]
+
+        self._apply_pair_results(pairs, results, positions, velocities)
+
+    # Accumulate solved contacts (in the order given), write the new state to objects
+    def _apply_pair_results(self, pairs, results, positions, velocities):
+        n = len(self._objects)
+
+        dv = np.zeros((n, 3), dtype=self._accumulate_dtype)
+        rewind = np.zeros(n, dtype=self._dtype)
+
+        hit = [k for k, result in enumerate(results) if result is not None]
+        if not hit:
+            return
+
+        self._contact_count += len(hit)
+
+        for k in hit:
+            a, b = pairs[k]
+            dv_a, dv_b, rewind_a, rewind_b, depth = results[k]
+
+            # One body per add.at call keeps the summation order exactly the contact
+            # order
+            np.add.at(dv, [a], dv_a)
+            np.add.at(dv, [b], dv_b)
+
+            # Rewinds don't add up, a body just gets rewound as far as its deepest
+            # contact needs
+            rewind[a] = max(rewind[a], rewind_a)
+            rewind[b] = max(rewind[b], rewind_b)
+
+            if self._contacts is not None:
+                self._record_contact(
+                    (
+                        self._step,
+                        self._handles[a],
+                        self._handles[b],
+                        self._objects[a].mass * dv_a,
+                        self._objects[b].mass * dv_b,
+                        depth,
                     )
-                    aObj_vel_f = (
-                        total_initial_momentum
-                        + bObj.mass
-                        * self._coeff_restitution
-                        * (bObj.velocity - aObj.velocity)
-                    ) / (aObj.mass + bObj.mass)
-
-                    bObj_vel_f = (
-                        total_initial_momentum
-                        + aObj.mass
-                        * self._coeff_restitution
-                        * (aObj.velocity - bObj.velocity)
-                    ) / (aObj.mass + bObj.mass)
-
-                    # Correct x vel
-                    aObj_vel_f[0] = -aObj_vel_f[0]
-                    bObj_vel_f[0] = -bObj_vel_f[0]
-
-                    # Correct positions too
-                    # basic idea: if(overlapping) { don't() }
-
-                    # Rewind overlapping objects by a little bit more than one dt
-                    # Kinda a hack but good enough
-                    rewind_dt = 1.01 * dt
-
-                    if (not a_grounded) and (not b_grounded):  # a and b can move
-                        while does_collide(aObj, bObj) is not None:
-                            aObj.position = (
-                                aObj.position - rewind_dt / 2 * aObj.velocity
-                            )
-                            bObj.position = (
-                                bObj.position - rewind_dt / 2 * bObj.velocity
-                            )
-
-                        # print('Ungrounding both')
-                        # aObj.grounded = False
-                        # bObj.grounded = False
-                    elif a_grounded:  # -> just b can move, so b moves
-                        while does_collide(aObj, bObj) is not None:
-                            bObj.position = bObj.position - rewind_dt * bObj.velocity
-
-                        # print('Ungrounding bObj')
-                        # bObj.grounded = False
-                    elif b_grounded:  # -> just a can move, so a moves
-                        while does_collide(aObj, bObj) is not None:
-                            aObj.position = aObj.position - rewind_dt * aObj.velocity
-
-                        # print('Ungrounding aObj')
-                        # aObj.grounded = False
-                    else:
-                        # print('oops two objects that are grounded just collided- undefined behavior; moving both')
-                        pass
-
-                    aObj.velocity = aObj_vel_f
-                    bObj.velocity = bObj_vel_f
-
-                    # print('after collide: a, b vels = ', aObj_vel_f, bObj_vel_f)
-
-                    """
-                    bToa = possible_collision.aPos - possible_collision.bPos
-
-                    # print('before a pos, b pos = ', aObj.position, bObj.position)
-                    if (not a_grounded) and (not b_grounded): # a and b can move
-                        # * 1.05 for some nice leeway
-                        # in case of floating point errors causing the displacement not to be enough (and making a collision loop)
-                        aObj.position = aObj.position + (1.05 * bToa) / 2
-                        bObj.position = bObj.position - (1.05 * bToa) / 2
-                    elif a_grounded: # -> just b can move, so b moves
-                        bObj.position = bObj.position - (1.05 * bToa)
-                    elif b_grounded: # -> just a can move, so a moves
-                        aObj.position = aObj.position + (1.05 * bToa)
-                    else:
-                        # print('oops two objects that are grounded just collided- undefined behavior; moving both')
-                        aObj.position = aObj.position + (1.05 * bToa) / 2
-                        bObj.position = bObj.position - (1.05 * bToa) / 2
-                    """
-
-                    # print('after  a pos, b pos = ', aObj.position, bObj.position)
+                )
+
+        touched = np.unique(pairs[hit].ravel())
+        for i in touched:
+            obj = self._objects[i]
+
+            if rewind[i] > 0:
+                obj.position = positions[i] - rewind[i] * velocities[i]
+
+            obj.velocity = (velocities[i] + dv[i]).astype(self._dtype, copy=False)
+
+    # Solve one contact against the given state without touching the objects
+    # Returns (dv a, dv b, rewind a, rewind b, depth), or None
+    # Rewinds are in units of the start velocity
+    def _solve_pair(self, a, b, positions, velocities, dt):
+        aObj = self._objects[a]
+        bObj = self._objects[b]
+
+        a_grounded = aObj.grounded or aObj.immovable or aObj.static
+        b_grounded = bObj.grounded or bObj.immovable or bObj.static
+
+        if a_grounded and b_grounded:
+            return None
+
+        a_pos = positions[a]
+        b_pos = positions[b]
+
+        if self._broadphase.periodic:
+            d = b_pos - a_pos
+            b_pos = a_pos + self._broadphase.minimum_image(d)
+
+        aProxy = ShapeProxy(aObj, a_pos)
+        bProxy = ShapeProxy(bObj, b_pos)
+
+        possible_collision = self._narrowphase(a, b, aProxy, bProxy)
+        if possible_collision is None:
+            return None
+
+        # Same elastic equations as apply_collisions
+        a_vel = velocities[a]
+        b_vel = velocities[b]
+
+        total_initial_momentum = aObj.mass * a_vel + bObj.mass * b_vel
+        aObj_vel_f = (
+            total_initial_momentum
+            + bObj.mass * self._coeff_restitution * (b_vel - a_vel)
+        ) / (aObj.mass + bObj.mass)
+        bObj_vel_f = (
+            total_initial_momentum
+            + aObj.mass * self._coeff_restitution * (a_vel - b_vel)
+        ) / (aObj.mass + bObj.mass)
+
+        # Correct x vel
+        aObj_vel_f[0] = -aObj_vel_f[0]
+        bObj_vel_f[0] = -bObj_vel_f[0]
+
+        # Same rewinding as apply_collisions, counted on the proxies
+        rewind_dt = 1.01 * dt
+        a_step = 0.0 if a_grounded else (rewind_dt / 2 if not b_grounded else rewind_dt)
+        b_step = 0.0 if b_grounded else (rewind_dt / 2 if not a_grounded else rewind_dt)
+
+        n_rewinds = 0
+        while (
+            n_rewinds < self._max_rewinds and does_collide(aProxy, bProxy) is not None
+        ):
+            n_rewinds += 1
+            aProxy.position = a_pos - n_rewinds * a_step * a_vel
+            bProxy.position = b_pos - n_rewinds * b_step * b_vel
+
+        dv_a = np.zeros_like(a_vel) if aObj.immovable else aObj_vel_f - a_vel
+        dv_b = np.zeros_like(b_vel) if bObj.immovable else bObj_vel_f - b_vel
+
+        return (
+            dv_a,
+            dv_b,
+            n_rewinds * a_step,
+            n_rewinds * b_step,
+            possible_collision.depth,
+        )
+
+    # Hash of the world state for regression checks
+    # (handles, positions, velocities, masses; in handle order)
+    # Two runs that hash the same at a step are bit-identical at that step
+    def state_hash(self):
+        order = np.argsort(self._handles, kind="stable")
+        state = self.state_arrays()
+
+        digest = hashlib.sha256()
+        digest.update(
+            np.ascontiguousarray(state["handles"][order], dtype=np.int64).tobytes()
+        )
+        for key in ("positions", "velocities", "masses"):
+            digest.update(
+                np.ascontiguousarray(state[key][order], dtype=np.float64).tobytes()
+            )
+
+        return digest.hexdigest()
 
     # make this class support the Python collections API for ease of use
     def __iter__(self):
@@ -271,7 +1361,40 @@ class PhysicsEngine:
         # ref: Python Cookbook 3rd Ed., Chapter 4.2
         return iter(self._objects)
 
+    def __len__(self):
+        return len(self._objects)
+
     # Get reference to objects set
     @property
     def objects(self):
         return self._objects
+
+    # Registered force applicators, in application order
+    @property
+    def force_applicators(self):
+        return self._force_applicators
+
+    # Handles of all objects, in index order
+    @property
+    def handles(self):
+        return np.array(self._handles, dtype=int)
+
+
+# Slab test of rays (origins, unit directions, (m, 3)) against boxes (lo, hi corners),
+# returns the entry and exit distances along each ray; the ray misses when entry > exit
+def _ray_box(origins, directions, lo, hi):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = 1.0 / directions
+        t1 = (lo - origins) * inv
+        t2 = (hi - origins) * inv
+
+    # Rays parallel to a slab: inside it for all t, or never
+    parallel = directions == 0
+    inside = (origins >= lo) & (origins <= hi)
+    t1 = np.where(parallel, np.where(inside, -np.inf, np.inf), t1)
+    t2 = np.where(parallel, np.where(inside, np.inf, -np.inf), t2)
+
+    t_enter = np.max(np.minimum(t1, t2), axis=1)
+    t_exit = np.min(np.maximum(t1, t2), axis=1)
+
+    return t_enter, t_exit
@@ -4,6 +4,7 @@ from PhysicsEngine import PhysicsEngine
 from DisplayEngine import DisplayEngine
 
 from PhysicalMixin import PhysicalMixin
+from Telemetry import Telemetry
 
 # This class marries physics to the display, managing the physics loop and the display loop
 # It takes care of synchronization between the two
@@ -27,6 +28,9 @@ class SimulationEngine:
     # timestamp
     _t: float
 
+    # Live metrics publisher (see Telemetry), None if off
+    _telemetry: Telemetry = None
+
     def __init__(self, **kwargs):
         # Setup world engine
         self._physics_engine = PhysicsEngine(**kwargs)
@@ -48,6 +52,10 @@ class SimulationEngine:
         else:
             self._physics_scalar = 2
 
+        # Opt-in live metrics, telemetry=Telemetry(...)
+        if "telemetry" in kwargs:
+            self._telemetry = kwargs["telemetry"]
+
         self._t = 0
 
         self._objects = []
@@ -74,34 +82,50 @@ class SimulationEngine:
 
         print("physics_rate =", physics_rate, ", physics_dt =", physics_dt)
 
-        infinite_run = n_sec is None
-
-        while (infinite_run) or (self._t < end_timestamp):
-            # print('loop')
-            # Base loop rate == physics rate
-            rate(physics_rate)
-
-            # Physics update
-            self._physics_engine.iterate(physics_dt)
-            # print('physics done')
-
-            self._t += physics_dt
-
-            # Use frameskips to only update the display at the display rate
-            # design inspired by video game emulators
-            # Every (self._physics_scalar) physics iterations is also a display iteration
-            if frameskip == max_frameskip:  # if display update due, update display
-                self._display_engine.iterate()
-                # print('display done')
-                frameskip = 1
-            else:  # else frameskip
-                frameskip += 1
-
-        # and one final iteration with that leftover time
-        dt_left = end_timestamp - self._t
-        self._physics_engine.iterate(dt_left)
-        self._t += dt_left
-        self._display_engine.iterate()
+        if self._telemetry is not None:
+            self._telemetry.start(timescale=timescale, engine=self._physics_engine)
+
+        try:
+            infinite_run = n_sec is None
+
+            while (infinite_run) or (self._t < end_timestamp):
+                # print('loop')
+                # Base loop rate == physics rate
+                rate(physics_rate)
+
+                # Physics update
+                self._physics_engine.iterate(physics_dt)
+                # print('physics done')
+
+                if self._telemetry is not None:
+                    self._telemetry.record_step(self._physics_engine, physics_dt)
+
+                self._t += physics_dt
+
+                # Use frameskips to only update the display at the display rate
+                # design inspired by video game emulators
+                # Every (self._physics_scalar) physics iterations is also a display
+                # iteration
+                if frameskip == max_frameskip:  # if display update due, update display
+                    self._display_engine.iterate()
+                    # print('display done')
+                    frameskip = 1
+                else:  # else frameskip
+                    frameskip += 1
+
+            # and one final iteration with that leftover time
+            dt_left = end_timestamp - self._t
+            self._physics_engine.iterate(dt_left)
+
+            if self._telemetry is not None:
+                self._telemetry.record_step(self._physics_engine, dt_left)
+
+            self._t += dt_left
+            self._display_engine.iterate()
+        finally:
+            # Also on errors, so the telemetry thread and sinks don't outlive the run
+            if self._telemetry is not None:
+                self._telemetry.stop()
 
     # Add an object to the simulation
     def register_object(self, obj):
@@ -6,12 +6,20 @@ from IForceApplicator import IForceApplicator
 # A constant "field" that doesn't feel like it changes anywhere
 class StaticLocalGravity(IForceApplicator):
     # Gravity vector to apply to all objects
-    _gravity_vec = np.array([0, 0, 0])
+    _gravity_vec = np.array([0.0, 0.0, 0.0])
 
     def __init__(self, gravity_vec):
-        self._gravity_vec = np.array(gravity_vec)
+        self._gravity_vec = np.array(gravity_vec, dtype=float)
         super().__init__()
 
-    def apply_forces(self, world):
+    def set_dtype(self, dtype):
+        super().set_dtype(dtype)
+        self._gravity_vec = self._gravity_vec.astype(dtype)
+
+    # -m g . x, zero at the origin
+    def potential_energy(self, positions, masses):
+        return -float(np.sum(masses * (positions @ self._gravity_vec.astype(float))))
+
+    def apply_forces(self, world, dt=None):
         for obj in world:
             obj.add_force(obj.mass * self._gravity_vec)
@@ -0,0 +1,354 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+
+import numpy as np
+
+
+# Opt-in live metrics for long runs, as newline-delimited JSON (one object per interval)
+#
+# Hand one to SimulationEngine(telemetry=...), or call record_step(engine, dt) after
+# every PhysicsEngine.iterate in a custom loop. Per interval it reports:
+#   steps, steps_per_sec      - physics steps taken, and their rate in wall time
+#   sim_time, wall_time       - physics time and wall time since start()
+#   drift                     - sim_time / timescale - wall_time, i.e. how far physics
+#                               runs ahead (+) or behind (-) real time
+#   realtime_factor           - physics seconds per wall second over the interval
+#   bodies, contacts          - body count, and collision contacts resolved during the
+#                               interval
+#   kinetic_energy, potential_energy, momentum
+#                             - potential_energy is null when it isn't known (see
+#                               below)
+#   dropped                   - snapshots dropped because the publisher thread fell
+#                               behind
+#
+# The simulation thread only counts steps and checks the clock every step (well under a
+# microsecond); once per interval it copies out positions, velocities and masses and
+# queues them. Energies, JSON and I/O all happen on a background thread, and a slow
+# consumer can only make snapshots get dropped, never stall the simulation. The copy
+# itself is an O(n) Python gather on the simulation thread, about 50 ms per 100k bodies,
+# so big worlds see a short hitch once per interval: use a longer interval there.
+#
+# start()/stop() bracket a run (SimulationEngine.run calls both); stop() closes the
+# sinks and the next start() reopens them, so one Telemetry can be reused across runs.
+#
+# Sinks (any combination):
+#   address=("127.0.0.1", port) - TCP server, every connected client gets every line
+#   address="/path/to/socket"   - same over a Unix socket
+#   path="telemetry.ndjson"     - rolling file, rolled over to path.1 ... path.<backups>
+#                                 past max_bytes
+#
+# Potential energy is the sum of every force applicator's potential_energy (see
+# IForceApplicator), unless a potential=fn(positions, masses) -> float is given. If any
+# applicator's potential isn't known (None, e.g. a custom force or a Barnes-Hut sized
+# MutualGravity), it's reported as null rather than a partial sum.
+class Telemetry:
+    # Wall seconds between reports
+    _interval: float
+
+    # Physics time per wall time that run() aims for (SimulationEngine's timescale)
+    _timescale: float = 1.0
+
+    # Potential energy function, fn(positions, masses) -> float, None for the default
+    _potential = None
+
+    # Socket sink address, None if there's no socket sink
+    _address = None
+
+    # Listening socket, and the clients connected to it
+    _server: socket.socket = None
+    _clients: list = None
+
+    # Rolling file sink
+    _path: str = None
+    _max_bytes: int
+    _backups: int
+    _file = None
+
+    # Snapshots handed from the simulation thread to the publisher thread
+    _queue: queue.Queue = None
+    _thread: threading.Thread = None
+
+    # Simulation-thread counters
+    _steps: int = 0
+    _sim_time: float = 0.0
+    _start_wall: float = None
+    _last_wall: float = None
+    _last_steps: int = 0
+    _last_sim_time: float = 0.0
+    _last_contacts: int = None
+    _dropped: int = 0
+
+    def __init__(
+        self,
+        interval=1.0,
+        address=None,
+        path=None,
+        max_bytes=10 * 2**20,
+        backups=3,
+        potential=None,
+    ):
+        if interval <= 0:
+            raise UserWarning("Telemetry: the reporting interval must be positive.")
+
+        if address is None and path is None:
+            raise UserWarning(
+                "Telemetry: need an address= and/or a path= to publish to."
+            )
+
+        self._interval = interval
+        self._potential = potential
+        self._address = address
+        self._clients = []
+
+        if path is not None:
+            self._path = os.fspath(path)
+            self._max_bytes = max_bytes
+            self._backups = backups
+
+        # A handful of snapshots is plenty, anything more means the publisher can't keep
+        # up anyway
+        self._queue = queue.Queue(maxsize=4)
+
+        # Open right away, so clients can connect (and address can be read) before the
+        # run starts
+        self._open_sinks()
+
+    def _open_sinks(self):
+        if self._address is not None and self._server is None:
+            if isinstance(self._address, (str, os.PathLike)):
+                if os.path.exists(self._address):
+                    os.unlink(self._address)
+                self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            else:
+                self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+
+            self._server.bind(self._address)
+            self._server.listen()
+            self._server.setblocking(False)
+
+        if self._path is not None and self._file is None:
+            self._file = open(self._path, "a")
+
+    # Address the socket sink listens on (e.g. the port after binding port 0), or None
+    @property
+    def address(self):
+        if self._server is None:
+            return None
+
+        return self._server.getsockname()
+
+    # Start the clock and the publisher thread (reopening the sinks after a stop())
+    # timescale: physics seconds per wall second the run aims for, engine: to count
+    # contacts from now on
+    def start(self, timescale=1.0, engine=None):
+        if self._thread is not None:
+            return
+
+        self._open_sinks()
+
+        self._timescale = timescale
+        self._start_wall = self._last_wall = time.perf_counter()
+
+        self._steps = self._last_steps = 0
+        self._sim_time = self._last_sim_time = 0.0
+        self._dropped = 0
+        self._last_contacts = engine.contact_count if engine is not None else None
+
+        self._thread = threading.Thread(
+            target=self._publish_loop, name="telemetry", daemon=True
+        )
+        self._thread.start()
+
+    # Count one physics step of dt on engine, snapshotting it once per interval
+    def record_step(self, engine, dt):
+        if self._thread is None:
+            self.start(engine=engine)
+
+        self._steps += 1
+        self._sim_time += dt
+
+        now = time.perf_counter()
+        if now - self._last_wall < self._interval:
+            return
+
+        contacts = engine.contact_count
+        if self._last_contacts is None:
+            self._last_contacts = 0
+
+        snapshot = {
+            "wall": now,
+            "state": self._gather(engine),
+            "steps": self._steps - self._last_steps,
+            "sim_time": self._sim_time,
+            "sim_elapsed": self._sim_time - self._last_sim_time,
+            "wall_elapsed": now - self._last_wall,
+            "contacts": contacts - self._last_contacts,
+            "applicators": list(engine.force_applicators),
+        }
+
+        self._last_wall = now
+        self._last_steps = self._steps
+        self._last_sim_time = self._sim_time
+        self._last_contacts = contacts
+
+        try:
+            self._queue.put_nowait(snapshot)
+        except queue.Full:
+            self._dropped += 1
+
+    # Just the state the metrics need, in one pass per array (concatenating the rows is
+    # about twice as fast as np.array on the list of them)
+    @staticmethod
+    def _gather(engine):
+        objects = engine.objects
+
+        if len(objects) == 0:
+            positions = velocities = np.zeros(0)
+        else:
+            positions = np.concatenate([obj.position for obj in objects])
+            velocities = np.concatenate([obj.velocity for obj in objects])
+
+        return {
+            "step": engine.step,
+            "positions": positions.reshape(-1, 3),
+            "velocities": velocities.reshape(-1, 3),
+            "masses": np.array([obj.mass for obj in objects], dtype=float),
+        }
+
+    # Sum of the applicators' potential energies, None if any of them isn't known
+    @staticmethod
+    def _potential_of(applicators, positions, masses):
+        total = 0.0
+        for force_applicator in applicators:
+            energy = force_applicator.potential_energy(positions, masses)
+            if energy is None:
+                return None
+            total += energy
+
+        return total
+
+    # Turn a snapshot into one report
+    def _metrics(self, snapshot):
+        state = snapshot["state"]
+        positions = state["positions"].astype(float)
+        velocities = state["velocities"].astype(float)
+        masses = state["masses"]
+
+        kinetic = 0.5 * float(
+            np.sum(masses * np.einsum("ij,ij->i", velocities, velocities))
+        )
+        momentum = (masses[:, np.newaxis] * velocities).sum(axis=0)
+
+        if self._potential is not None:
+            potential = float(self._potential(positions, masses))
+        else:
+            potential = self._potential_of(snapshot["applicators"], positions, masses)
+
+        wall_time = snapshot["wall"] - self._start_wall
+
+        return {
+            "time": time.time(),
+            "step": int(state["step"]),
+            "steps": snapshot["steps"],
+            "steps_per_sec": snapshot["steps"] / snapshot["wall_elapsed"],
+            "sim_time": snapshot["sim_time"],
+            "wall_time": wall_time,
+            "drift": snapshot["sim_time"] / self._timescale - wall_time,
+            "realtime_factor": snapshot["sim_elapsed"] / snapshot["wall_elapsed"],
+            "bodies": len(masses),
+            "contacts": snapshot["contacts"],
+            "kinetic_energy": kinetic,
+            "potential_energy": potential,
+            "momentum": momentum.tolist(),
+            "dropped": self._dropped,
+        }
+
+    def _publish_loop(self):
+        while True:
+            snapshot = self._queue.get()
+            if snapshot is None:
+                break
+
+            line = json.dumps(self._metrics(snapshot)) + "\n"
+            self._publish(line)
+
+    def _publish(self, line):
+        if self._server is not None:
+            self._accept_clients()
+
+            data = line.encode()
+            for client in list(self._clients):
+                try:
+                    client.sendall(data)
+                except OSError:
+                    # Gone, or too slow to keep up
+                    self._clients.remove(client)
+                    client.close()
+
+        if self._file is not None:
+            if self._file.tell() + len(line) > self._max_bytes:
+                self._roll_file()
+
+            self._file.write(line)
+            self._file.flush()
+
+    def _accept_clients(self):
+        while True:
+            try:
+                client, _ = self._server.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+
+            # Don't let a stuck client hold up the publisher for long
+            client.settimeout(0.5)
+            self._clients.append(client)
+
+    # path -> path.1 -> path.2 ... -> path.<backups> (dropped)
+    def _roll_file(self):
+        self._file.close()
+
+        for i in range(self._backups - 1, 0, -1):
+            src = f"{self._path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self._path}.{i + 1}")
+
+        if self._backups > 0:
+            os.replace(self._path, f"{self._path}.1")
+        else:
+            os.remove(self._path)
+
+        self._file = open(self._path, "a")
+
+    # Publish whatever is queued, stop the publisher thread and close the sinks
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+        for client in self._clients:
+            client.close()
+        self._clients = []
+
+        if self._server is not None:
+            address = self._server.getsockname()
+            self._server.close()
+            self._server = None
+
+            if isinstance(address, str) and os.path.exists(address):
+                os.unlink(address)
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
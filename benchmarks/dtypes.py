@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "forces"))
+
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+from MutualGravity import MutualGravity  # noqa: E402
+
+
+# Compare float64 and float32 state: memory per body, the exact n-body gravity kernel,
+# and a full engine step
+# Per body, "vectors" is just the position/velocity/force arrays' data and "total" is
+# everything registering a body allocates (traced). The total is mostly Python object
+# overhead, which doesn't shrink with the dtype; the kernel's (n, n, 3) temporaries do.
+def benchmark_dtypes(n_bodies=3000, n_steps=5):
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(0, 100, (n_bodies, 3))
+    velocities = rng.normal(0, 1, (n_bodies, 3))
+
+    print(f"{n_bodies} bodies")
+    print(
+        "dtype     vectors B/body   total B/body"
+        "   kernel peak (MB)   kernel (s)   step (s)"
+    )
+
+    for dtype in (np.float64, np.float32):
+        engine = PhysicsEngine(dtype=dtype, bounds=([0, 0, 0], [100, 100, 100]))
+        gravity = MutualGravity(mode="exact", eps=0.1, G=1e-3)
+        engine.add_force_applicator(gravity)
+
+        tracemalloc.start()
+        engine.register_many(positions, velocities, radii=0.1)
+        total_bytes = tracemalloc.get_traced_memory()[0] / n_bodies
+        tracemalloc.stop()
+
+        obj = engine.objects[0]
+        state_bytes = obj.position.nbytes + obj.velocity.nbytes + obj.net_force.nbytes
+
+        p = positions.astype(dtype)
+        m = np.ones(n_bodies, dtype=dtype)
+
+        tracemalloc.start()
+        accel = gravity.accelerations(p, m)
+        kernel_peak = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+        assert accel.dtype == dtype
+
+        t0 = time.perf_counter()
+        gravity.accelerations(p, m)
+        kernel_time = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(n_steps):
+            engine.iterate(0.01)
+        step_time = (time.perf_counter() - t0) / n_steps
+        assert engine.objects[0].position.dtype == dtype
+
+        print(
+            f"{np.dtype(dtype).name:9s} {state_bytes:14d}   {total_bytes:12.0f}"
+            f"   {kernel_peak:16.1f}   {kernel_time:10.4f}   {step_time:8.4f}"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_dtypes()
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "forces"))
+
+from ParallelBackend import ParallelBackend  # noqa: E402
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+from MutualGravity import MutualGravity  # noqa: E402
+
+
+# Exact mode builds (n, n, 3) float64 temporaries, ~54 MB per evaluation at 1500
+# bodies but ~384 MB at 4000, so it's capped here
+MAX_EXACT_BODIES = 1500
+
+
+# Time one MutualGravity evaluation and one engine step, for 1..max_workers
+def benchmark(n_bodies=1500, mode="exact", max_workers=None, repeats=3):
+    if mode == "exact" and n_bodies > MAX_EXACT_BODIES:
+        raise UserWarning(
+            f"benchmark: exact mode is capped at {MAX_EXACT_BODIES} bodies, use "
+            "mode='barnes_hut' for more."
+        )
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    rng = np.random.default_rng(0)
+    positions = rng.normal(size=(n_bodies, 3))
+    masses = rng.uniform(1.0, 2.0, n_bodies)
+    velocities = rng.normal(size=(n_bodies, 3))
+
+    reference = None
+    base_time = None
+    base_step = None
+
+    print(f"MutualGravity {mode}, {n_bodies} bodies")
+    print("workers   kernel (s)   speedup   step (s)   speedup   identical")
+
+    for workers in range(1, max_workers + 1):
+        backend = ParallelBackend(workers=workers)
+        gravity = MutualGravity(mode=mode, eps=0.01)
+        gravity.set_backend(backend)
+
+        best = np.inf
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            accel = gravity.accelerations(positions, masses)
+            best = min(best, time.perf_counter() - t0)
+
+        backend.shutdown()
+
+        # Full step: gravity plus the (serial) collision pass and integration
+        engine = PhysicsEngine(workers=workers, deterministic=True)
+        engine.add_force_applicator(MutualGravity(mode=mode, eps=0.01))
+        engine.register_many(positions * 10, velocities, radii=0.05, masses=masses)
+
+        step = np.inf
+        for _ in range(repeats):
+            t0 = time.perf_counter()
+            engine.iterate(0.001)
+            step = min(step, time.perf_counter() - t0)
+
+        engine.shutdown()
+
+        if reference is None:
+            reference = accel
+            base_time = best
+            base_step = step
+
+        identical = np.array_equal(accel, reference)
+        print(
+            f"{workers:7d}   {best:10.4f}   {base_time / best:7.2f}"
+            f"   {step:8.4f}   {base_step / step:7.2f}   {identical}"
+        )
+
+
+if __name__ == "__main__":
+    benchmark()
+    benchmark(n_bodies=4000, mode="barnes_hut")
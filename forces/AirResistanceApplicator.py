@@ -1,3 +1,33 @@
+from functools import lru_cache
+
+import numpy as np
+
+from IForceApplicator import IForceApplicator
+
+
+# Quadratic drag through a standard (troposphere) atmosphere
+#
+# Two ways of getting air density are supported:
+#   mode="exact"     - evaluate rho(h) analytically for every body, every step (the
+#                      default). Pass cache_size=n to memoize rho per altitude, which
+#                      pays off when many bodies sit at the same heights (resting
+#                      objects, stacked boxes, etc.)
+#   mode="tabulated" - precompute rho(h) once on a uniform grid over [h_min, h_max] with
+#                      spacing h_step, then linearly interpolate for all bodies in one
+#                      np.interp call. Altitudes outside of the table fall back to the
+#                      exact form.
+#
+# Error of the tabulated mode vs. the analytic form:
+#   rho ~ (1 - L*h/T0)^n with n = g*M/(R*L) - 1 ~= 4.26, so
+#   rho''/rho = n*(n-1)*(L/T(h))^2.
+#   Linear interpolation error is bounded by h_step^2/8 * |rho''|, which gives a
+#   relative error of at most ~1.6e-9 * h_step^2 anywhere below the tropopause (11 km),
+#   e.g.
+#       h_step =   1 m -> ~1.6e-9
+#       h_step =  10 m -> ~1.6e-7  (default)
+#       h_step = 100 m -> ~1.6e-5
+#   The formula itself is only defined for h < T0/L (~44.3 km), so h_max is capped
+#   there.
 class AirResistanceApplicator(IForceApplicator):
     # ideal gas constant
     R = 8.31445  # J/(mol K)
@@ -19,8 +49,19 @@ class AirResistanceApplicator(IForceApplicator):
     # Earth standard gravity
     g0 = 9.80665  # m/s^2
 
+    # Density lookup mode, "exact" or "tabulated"
+    _mode: str
+
+    # Table altitudes and densities (tabulated mode only)
+    _table_h: np.ndarray = None
+    _table_rho: np.ndarray = None
+
+    # Memoized rho (exact mode only, None if caching is off)
+    _rho_cached = None
+
     # Equations for density of air as a function of altitude above sea level
     # https://en.wikipedia.org/wiki/Density_of_air#Variation_with_altitude
+    # All of these work element-wise on numpy arrays of altitudes as well as on scalars
 
     # Gravity felt at height h meters above sea level (https://en.wikipedia.org/wiki/Gravity_of_Earth#Altitude)
     def g(self, h):  # m/s^2
@@ -40,27 +81,101 @@ class AirResistanceApplicator(IForceApplicator):
     def rho(self, h):
         return self.p(h) * self.M / (self.R * self.T(h))
 
-    def __init__(self):
-        return
+    def __init__(self, **kwargs):
+        if "mode" in kwargs:
+            self._mode = kwargs["mode"]
+        else:
+            self._mode = "exact"
+
+        if self._mode == "tabulated":
+            h_min = kwargs["h_min"] if "h_min" in kwargs else 0.0
+            h_max = kwargs["h_max"] if "h_max" in kwargs else 11000.0  # tropopause
+            h_step = kwargs["h_step"] if "h_step" in kwargs else 10.0
+
+            if h_max >= self.T0 / self.L:
+                raise UserWarning(
+                    "AirResistanceApplicator: h_max must be below T0/L, the atmosphere"
+                    " model isn't defined past that."
+                )
+
+            if h_step <= 0 or h_max <= h_min:
+                raise UserWarning(
+                    "AirResistanceApplicator: need h_min < h_max and a positive h_step"
+                    " for the density table."
+                )
+
+            n_samples = int(np.ceil((h_max - h_min) / h_step)) + 1
+            self._table_h = np.linspace(h_min, h_max, n_samples)
+            self._table_rho = self.rho(self._table_h)
+        elif self._mode == "exact":
+            if "cache_size" in kwargs and kwargs["cache_size"]:
+                self._rho_cached = lru_cache(maxsize=kwargs["cache_size"])(self.rho)
+        else:
+            raise UserWarning(
+                f"AirResistanceApplicator: unknown density mode '{self._mode}'."
+            )
 
-    def apply_forces(self, objects, dt):
-        for obj in objects:
-            C_D = obj.coeff_drag
-            A = obj.crosssectional_area
-            h = obj.position[1]
+        super().__init__()
 
-            vel_mag = np.linalg.norm(obj.velocity)
+    # Air density for an array of altitudes, in whichever mode this applicator uses
+    def density(self, h):
+        h = np.asarray(h, dtype=self._dtype)
 
-            F_D_magnitude = (
-                (1 / 2) * self.rho(h) * np.linalg.norm(obj.velocity) ** 2 * C_D * A
+        if self._mode == "tabulated":
+            rho = np.interp(h, self._table_h, self._table_rho).astype(
+                h.dtype, copy=False
             )
 
-            if vel_mag != 0.0:
-                vel_unit = obj.velocity / np.linalg.norm(obj.velocity)
-            else:
-                vel_unit = np.array([0, 0, 0])
+            # Out of table range, fall back to the analytic form
+            outside = (h < self._table_h[0]) | (h > self._table_h[-1])
+            if outside.any():
+                rho[outside] = self.rho(h[outside])
+
+            return rho
 
-            F_D = -vel_unit * F_D_magnitude
+        if self._rho_cached is not None:
+            return np.array(
+                [self._rho_cached(float(x)) for x in h.ravel()], dtype=h.dtype
+            ).reshape(h.shape)
 
-            # print('AirResistance: Applying a force of ', F_D)
-            obj.add_force(F_D)
+        if self._kernels is not None:
+            return self._kernels.air_density(
+                h, self.p0, self.L, self.T0, self.g0, self.R_E, self.M, self.R
+            )
+
+        return self.rho(h)
+
+    # Cache statistics for the exact mode's per-altitude cache (None if caching is off)
+    def cache_info(self):
+        if self._rho_cached is None:
+            return None
+
+        return self._rho_cached.cache_info()
+
+    # Drag only ever takes energy out
+    def potential_energy(self, positions, masses):
+        return 0.0
+
+    def apply_forces(self, objects, dt):
+        if len(objects) == 0:
+            return
+
+        # Gather everything once so the drag equation runs over all bodies at once
+        C_D = np.array([obj.coeff_drag for obj in objects], dtype=self._dtype)
+        A = np.array([obj.crosssectional_area for obj in objects], dtype=self._dtype)
+        velocity = np.array([obj.velocity for obj in objects], dtype=self._dtype)
+        h = np.array([obj.position[1] for obj in objects], dtype=self._dtype)
+
+        # F_D = -1/2 * rho * |v|^2 * C_D * A * v_hat == -1/2 * rho * |v| * C_D * A * v
+        # Second form needs no unit vector, so v = 0 needs no special case
+        def rows(start, stop):
+            v = velocity[start:stop]
+            vel_mag = np.linalg.norm(v, axis=1)
+            scale = 0.5 * self.density(h[start:stop]) * vel_mag * C_D[start:stop]
+            return -(scale * A[start:stop])[:, np.newaxis] * v
+
+        F_D = self._over_bodies(rows, len(objects))
+
+        for obj, force in zip(objects, F_D):
+            # print('AirResistance: Applying a force of ', force)
+            obj.add_force(force)
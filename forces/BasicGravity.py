@@ -1,3 +1,5 @@
+import numpy as np
+
 from IForceApplicator import IForceApplicator
 
 
@@ -15,8 +17,13 @@ class BasicGravity(IForceApplicator):
     def __init__(self):
         return
 
+    # m g0 R_E h / (R_E + h), the integral of m g(h) up from sea level (zero there)
+    def potential_energy(self, positions, masses):
+        h = positions[:, 1]
+        return float(np.sum(masses * self.g0 * self.R_E * h / (self.R_E + h)))
+
     def apply_forces(self, objects, dt):
         for obj in objects:
             h = obj.position[1]  # y-axis == h
-            F_G = np.array([0, obj.mass * -self.g(h), 0])
+            F_G = np.array([0.0, obj.mass * -self.g(h), 0.0], dtype=self._dtype)
             obj.add_force(F_G)
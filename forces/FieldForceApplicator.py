@@ -0,0 +1,199 @@
+import numpy as np
+
+from IForceApplicator import IForceApplicator
+
+
+# Forces from a gridded 3D vector field, e.g. measured/simulated wind data
+#
+# The grid is a .npy file that gets memory-mapped, so only the cells actually sampled
+# get paged in:
+#   static field:         shape (nx, ny, nz, 3)
+#   time-dependent field: shape (nt, nx, ny, nz, 3), frames t_step seconds apart
+#                         starting at t0
+# Cell (i, j, k) sits at origin + (i, j, k) * spacing. An in-memory array can be passed
+# as field= instead of path= (handy for generated fields).
+#
+# The field is trilinearly interpolated (and linearly in time, for time-dependent
+# fields) at every body's position in one vectorized pass. Positions outside the grid
+# are clamped to its edge.
+#
+# Force laws (law=):
+#   "drag"         - field is wind velocity (m/s). Quadratic drag relative to the local
+#                    wind, F = 1/2 * rho * |w - v| * (w - v) * C_D * A, using the body's
+#                    coeff_drag and crosssectional_area (same model as
+#                    AirResistanceApplicator, constant rho)
+#   "acceleration" - field is an acceleration (m/s^2), F = m * a
+#   "force"        - field is a force (N), applied as is
+class FieldForceApplicator(IForceApplicator):
+    # The (possibly memory-mapped) grid
+    _field: np.ndarray
+
+    # True if the first axis of the grid is time
+    _time_dependent: bool
+
+    # World position of grid cell (0, 0, 0), m
+    _origin: np.ndarray
+
+    # Distance between grid cells along each axis, m
+    _spacing: np.ndarray
+
+    # Time of the first frame and time between frames, s (time-dependent fields only)
+    _t0: float
+    _t_step: float
+
+    # Simulation time as seen by this applicator, advanced by dt on every apply_forces
+    # Always a Python float, a float32 clock would drift over long runs
+    _t: float
+
+    # Force law, "drag", "acceleration" or "force"
+    _law: str
+
+    # Fluid density for the drag law, kg/m^3
+    _rho: float
+
+    def __init__(self, **kwargs):
+        if "path" in kwargs:
+            self._field = np.load(kwargs["path"], mmap_mode="r")
+        elif "field" in kwargs:
+            self._field = np.asarray(kwargs["field"])
+        else:
+            raise UserWarning("FieldForceApplicator: need either a path= or a field=.")
+
+        if self._field.ndim == 4:
+            self._time_dependent = False
+        elif self._field.ndim == 5:
+            self._time_dependent = True
+        else:
+            raise UserWarning(
+                "FieldForceApplicator: field must be (nx, ny, nz, 3)"
+                " or (nt, nx, ny, nz, 3)."
+            )
+
+        if self._field.shape[-1] != 3:
+            raise UserWarning("FieldForceApplicator: field must hold 3D vectors.")
+
+        self._origin = np.array(
+            kwargs["origin"] if "origin" in kwargs else [0.0, 0.0, 0.0], dtype=float
+        )
+
+        spacing = kwargs["spacing"] if "spacing" in kwargs else 1.0
+        self._spacing = np.broadcast_to(np.array(spacing, dtype=float), (3,)).copy()
+
+        self._t0 = kwargs["t0"] if "t0" in kwargs else 0.0
+        self._t_step = kwargs["t_step"] if "t_step" in kwargs else 1.0
+        self._t = kwargs["t"] if "t" in kwargs else self._t0
+
+        self._law = kwargs["law"] if "law" in kwargs else "drag"
+        self._rho = kwargs["rho"] if "rho" in kwargs else 1.225  # sea level air
+
+        if self._law not in ("drag", "acceleration", "force"):
+            raise UserWarning(f"FieldForceApplicator: unknown force law '{self._law}'.")
+
+        if np.any(self._spacing <= 0) or self._t_step <= 0:
+            raise UserWarning("FieldForceApplicator: grid spacing must be positive.")
+
+        super().__init__()
+
+    # Interpolated field vectors, (n, 3), at positions (n, 3) and time t (default: now)
+    def sample(self, positions, t=None):
+        positions = np.asarray(positions, dtype=self._dtype)
+
+        spatial_shape = np.array(self._field.shape[-4:-1])
+
+        # Fractional cell coordinates, clamped into the grid
+        u = (positions - self._origin.astype(positions.dtype)) / self._spacing.astype(
+            positions.dtype
+        )
+        u = np.clip(u, 0, spatial_shape - 1)
+
+        # Lower corner, kept one below the top so i0 + 1 stays in range (f = 1 covers
+        # the top edge)
+        i0 = np.minimum(np.floor(u).astype(np.intp), np.maximum(spatial_shape - 2, 0))
+        f = u - i0
+        i1 = np.minimum(i0 + 1, spatial_shape - 1)
+
+        if not self._time_dependent:
+            return self._trilinear(self._field, i0, i1, f).astype(
+                positions.dtype, copy=False
+            )
+
+        if t is None:
+            t = self._t
+
+        n_frames = self._field.shape[0]
+        s = np.clip((t - self._t0) / self._t_step, 0, n_frames - 1)
+        k0 = min(int(np.floor(s)), max(n_frames - 2, 0))
+        k1 = min(k0 + 1, n_frames - 1)
+        w = s - k0
+
+        w = positions.dtype.type(w)
+        sampled = (1 - w) * self._trilinear(self._field[k0], i0, i1, f) + w * (
+            self._trilinear(self._field[k1], i0, i1, f)
+        )
+        return sampled.astype(positions.dtype, copy=False)
+
+    # Blend the 8 cell corners around each sample point
+    @staticmethod
+    def _trilinear(grid, i0, i1, f):
+        x0, y0, z0 = i0[:, 0], i0[:, 1], i0[:, 2]
+        x1, y1, z1 = i1[:, 0], i1[:, 1], i1[:, 2]
+        fx, fy, fz = f[:, 0:1], f[:, 1:2], f[:, 2:3]
+
+        c00 = (1 - fx) * grid[x0, y0, z0] + fx * grid[x1, y0, z0]
+        c10 = (1 - fx) * grid[x0, y1, z0] + fx * grid[x1, y1, z0]
+        c01 = (1 - fx) * grid[x0, y0, z1] + fx * grid[x1, y0, z1]
+        c11 = (1 - fx) * grid[x0, y1, z1] + fx * grid[x1, y1, z1]
+
+        c0 = (1 - fy) * c00 + fy * c10
+        c1 = (1 - fy) * c01 + fy * c11
+
+        return (1 - fz) * c0 + fz * c1
+
+    # Drag only ever takes energy out; a sampled force field needn't have a potential
+    def potential_energy(self, positions, masses):
+        return 0.0 if self._law == "drag" else None
+
+    def apply_forces(self, objects, dt):
+        if len(objects) == 0:
+            self._t += float(dt)
+            return
+
+        positions = np.array([obj.position for obj in objects], dtype=self._dtype)
+
+        if self._law == "drag":
+            velocity = np.array([obj.velocity for obj in objects], dtype=self._dtype)
+            C_D = np.array([obj.coeff_drag for obj in objects], dtype=self._dtype)
+            A = np.array(
+                [obj.crosssectional_area for obj in objects], dtype=self._dtype
+            )
+
+            def rows(start, stop):
+                v_rel = self.sample(positions[start:stop]) - velocity[start:stop]
+                v_rel_mag = np.linalg.norm(v_rel, axis=1)
+
+                scale = 0.5 * self._rho * v_rel_mag * C_D[start:stop] * A[start:stop]
+                return scale[:, np.newaxis] * v_rel
+
+        elif self._law == "acceleration":
+            masses = np.array([obj.mass for obj in objects], dtype=self._dtype)
+
+            def rows(start, stop):
+                field = self.sample(positions[start:stop])
+                return masses[start:stop, np.newaxis] * field
+
+        else:
+
+            def rows(start, stop):
+                return self.sample(positions[start:stop])
+
+        forces = self._over_bodies(rows, len(objects))
+
+        for obj, force in zip(objects, forces):
+            obj.add_force(force)
+
+        self._t += float(dt)
+
+    # Current field time, s
+    @property
+    def t(self):
+        return self._t
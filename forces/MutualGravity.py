@@ -0,0 +1,258 @@
+import numpy as np
+
+from IForceApplicator import IForceApplicator
+
+
+# Newtonian gravity between every pair of bodies in the world (as opposed to
+# BasicGravity, which is a uniform field towards the Earth). Good for clustered debris,
+# star clusters, etc.
+#
+# Softened with a Plummer length eps so close passes don't blow up:
+#   F_i = G * m_i * sum_j m_j * (x_j - x_i) / (|x_j - x_i|^2 + eps^2)^(3/2)
+#
+# Modes:
+#   mode="exact"      - all pairs at once with numpy broadcasting, O(n^2) time and
+#                       memory. Fine (and exact) for a few thousand bodies.
+#   mode="barnes_hut" - octree rebuilt from the position array every step, O(n log n). A
+#                       node of width s at distance r is treated as a single point mass
+#                       when s / r < theta. theta = 0 degenerates to the exact sum, ~0.5
+#                       is the usual speed/accuracy pick.
+#   mode="auto"       - exact up to exact_max_n bodies, Barnes-Hut above that (default)
+#
+# With a parallel backend, the bodies being pulled on are split into chunks that each
+# sum over every source on their own thread. Each body's sum is unchanged, so results
+# match the single-core ones bit for bit.
+class MutualGravity(IForceApplicator):
+    # Gravitational constant
+    G = 6.6743 * 10**-11  # m^3/(kg s^2)
+
+    # Force law mode, "exact", "barnes_hut" or "auto"
+    _mode: str
+
+    # Softening length, m
+    _eps: float
+
+    # Barnes-Hut opening angle, dimensionless
+    _theta: float
+
+    # Max number of bodies per octree leaf before it's split
+    _leaf_size: int
+
+    # Largest world that "auto" mode still solves exactly
+    _exact_max_n: int
+
+    # Max octree depth, guards against coincident bodies splitting forever
+    _max_depth: int = 32
+
+    def __init__(self, **kwargs):
+        if "G" in kwargs:
+            self.G = kwargs["G"]
+
+        self._mode = kwargs["mode"] if "mode" in kwargs else "auto"
+        self._eps = kwargs["eps"] if "eps" in kwargs else 0.0
+        self._theta = kwargs["theta"] if "theta" in kwargs else 0.5
+        self._leaf_size = kwargs["leaf_size"] if "leaf_size" in kwargs else 8
+        self._exact_max_n = kwargs["exact_max_n"] if "exact_max_n" in kwargs else 1024
+
+        if self._mode not in ("exact", "barnes_hut", "auto"):
+            raise UserWarning(f"MutualGravity: unknown mode '{self._mode}'.")
+
+        if self._theta < 0:
+            raise UserWarning("MutualGravity: theta can't be negative.")
+
+        if self._leaf_size < 1:
+            raise UserWarning("MutualGravity: leaf_size must be at least 1.")
+
+        super().__init__()
+
+    # Acceleration on every body, (n, 3), from positions (n, 3) and masses (n,)
+    def accelerations(self, positions, masses):
+        positions = np.asarray(positions, dtype=self._dtype)
+        masses = np.asarray(masses, dtype=self._dtype)
+
+        if self._mode == "exact" or (
+            self._mode == "auto" and len(masses) <= self._exact_max_n
+        ):
+            return self._accelerations_exact(positions, masses)
+
+        return self._accelerations_barnes_hut(positions, masses)
+
+    def apply_forces(self, objects, dt):
+        if len(objects) < 2:
+            return
+
+        positions = np.array([obj.position for obj in objects], dtype=self._dtype)
+        masses = np.array([obj.mass for obj in objects], dtype=self._dtype)
+
+        forces = masses[:, np.newaxis] * self.accelerations(positions, masses)
+
+        for obj, force in zip(objects, forces):
+            obj.add_force(force)
+
+    # Softened potential energy, -G sum over pairs i < j of m_i m_j / sqrt(r^2 + eps^2)
+    # Summed exactly, O(n^2), in blocks of rows that keep the temporaries around 1M
+    # pairs. None for worlds that "auto" would hand to Barnes-Hut, too big to sum.
+    def potential_energy(self, positions, masses):
+        n = len(masses)
+        if self._mode != "exact" and n > self._exact_max_n:
+            return None
+
+        positions = np.asarray(positions, dtype=float)
+        masses = np.asarray(masses, dtype=float)
+
+        energy = 0.0
+        block = max(1, 2**20 // max(n, 1))
+        for start in range(0, n, block):
+            stop = min(start + block, n)
+
+            d = positions[np.newaxis, :, :] - positions[start:stop, np.newaxis, :]
+            r2 = np.einsum("ijk,ijk->ij", d, d) + self._eps**2
+
+            # Each pair once (j > i); coincident bodies without softening are skipped,
+            # like in _kernel
+            pair = np.arange(n)[np.newaxis, :] > np.arange(start, stop)[:, np.newaxis]
+            pair &= r2 > 0
+
+            inv_r = np.zeros_like(r2)
+            inv_r[pair] = r2[pair] ** -0.5
+            energy -= self.G * float(masses[start:stop] @ inv_r @ masses)
+
+        return energy
+
+    # Softened pairwise kernel, sum_j m_j * d_ij / (|d_ij|^2 + eps^2)^(3/2), times G
+    # d: (..., k, 3) separations, m: (..., k) source masses
+    # Zero separations contribute nothing.
+    def _kernel(self, d, m):
+        r2 = np.einsum("...i,...i->...", d, d) + self._eps**2
+
+        inv_r3 = np.zeros_like(r2)
+        nonzero = r2 > 0
+        inv_r3[nonzero] = r2[nonzero] ** -1.5
+
+        return self.G * np.einsum("...k,...ki->...i", m * inv_r3, d)
+
+    def _accelerations_exact(self, positions, masses):
+        # d[i, j] = x_j - x_i, for targets i in [start, stop)
+        def rows(start, stop):
+            d = positions[np.newaxis, :, :] - positions[start:stop, np.newaxis, :]
+
+            # Self-interaction has d = 0, _kernel already drops it (even with eps > 0
+            # it'd be zero)
+            return self._kernel(d, np.broadcast_to(masses, (stop - start, len(masses))))
+
+        return self._over_bodies(rows, len(masses))
+
+    def _accelerations_barnes_hut(self, positions, masses):
+        tree = _Octree(positions, masses, self._leaf_size, self._max_depth)
+
+        def rows(start, stop):
+            accelerations = self._walk(tree, positions, masses, np.arange(start, stop))
+            return accelerations[start:stop]
+
+        return self._over_bodies(rows, len(masses))
+
+    # Accelerations of `targets` from the whole tree (other bodies' rows are left zero)
+    def _walk(self, tree, positions, masses, targets):
+        accel = np.zeros_like(positions)
+
+        # Walk the tree with every body at once: each stack entry is a node plus the
+        # bodies that still need to resolve it. Bodies that accept a node as a point
+        # mass drop out of the walk, the rest are handed down to the node's children.
+        stack = [(0, targets)]
+
+        while stack:
+            node, bodies = stack.pop()
+
+            if tree.children[node] is None:  # leaf, direct sum against its bodies
+                members = tree.members[node]
+                d = (
+                    positions[members][np.newaxis, :, :]
+                    - positions[bodies][:, np.newaxis, :]
+                )
+                m = np.broadcast_to(masses[members], (len(bodies), len(members)))
+                accel[bodies] += self._kernel(d, m)
+                continue
+
+            d = tree.com[node] - positions[bodies]
+            r = np.linalg.norm(d, axis=1)
+
+            # size / r < theta, written so r = 0 never opens a node as a point mass
+            far = tree.width[node] < self._theta * r
+
+            if far.any():
+                far_bodies = bodies[far]
+                accel[far_bodies] += self._kernel(
+                    d[far][:, np.newaxis, :],
+                    np.full((len(far_bodies), 1), tree.mass[node]),
+                )
+
+            near_bodies = bodies[~far]
+            if len(near_bodies) > 0:
+                for child in tree.children[node]:
+                    stack.append((child, near_bodies))
+
+        return accel
+
+
+# Flat octree over a position array, built top-down
+# Nodes are indices into the parallel lists below.
+class _Octree:
+    def __init__(self, positions, masses, leaf_size, max_depth):
+        self.com = []  # center of mass of each node
+        self.mass = []  # total mass of each node
+        self.width = []  # edge length of each node's cube
+        self.children = []  # child node indices, None for leaves
+        self.members = []  # body indices for leaves, None for internal nodes
+
+        self._positions = positions
+        self._masses = masses
+        self._leaf_size = leaf_size
+        self._max_depth = max_depth
+
+        lo = positions.min(axis=0)
+        hi = positions.max(axis=0)
+        center = (lo + hi) / 2
+        width = max(float(np.max(hi - lo)), 1e-12)
+
+        self._build(np.arange(len(masses)), center, width, 0)
+
+    def _build(self, bodies, center, width, depth):
+        node = len(self.mass)
+
+        m = self._masses[bodies]
+        total_mass = m.sum()
+
+        if total_mass > 0:
+            com = (m[:, np.newaxis] * self._positions[bodies]).sum(axis=0) / total_mass
+        else:
+            com = self._positions[bodies].mean(axis=0)
+
+        self.com.append(com)
+        self.mass.append(total_mass)
+        self.width.append(width)
+        self.children.append(None)
+        self.members.append(None)
+
+        if len(bodies) <= self._leaf_size or depth >= self._max_depth:
+            self.members[node] = bodies
+            return node
+
+        # Octant code: bit 0 = +x half, bit 1 = +y half, bit 2 = +z half
+        above = self._positions[bodies] >= center
+        octant = above[:, 0] * 1 + above[:, 1] * 2 + above[:, 2] * 4
+
+        children = []
+        for code in range(8):
+            in_octant = bodies[octant == code]
+            if len(in_octant) == 0:
+                continue
+
+            offset = np.array([code & 1, (code >> 1) & 1, (code >> 2) & 1]) - 0.5
+            children.append(
+                self._build(
+                    in_octant, center + offset * width / 2, width / 2, depth + 1
+                )
+            )
+
+        self.children[node] = children
+        return node
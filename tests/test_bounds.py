@@ -0,0 +1,87 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+
+BOUNDS = ([0, 0, 0], [10, 10, 10])
+
+
+def one_body(bounds_mode, position, velocity, **kwargs):
+    engine = PhysicsEngine(bounds=BOUNDS, bounds_mode=bounds_mode, **kwargs)
+    (handle,) = engine.register_many([position], [velocity], radii=1.0)
+    return engine, handle
+
+
+# Reflect: the overshoot past the wall (less the radius) is mirrored back in, and the
+# velocity turns around, scaled by the coefficient of restitution
+def test_reflect():
+    engine, handle = one_body(
+        "reflect", [8.5, 5, 2.5], [10, 0, -30], coeff_restitution=0.5
+    )
+    engine.iterate(0.1)
+
+    body = engine.get(handle)
+    assert np.allclose(body.position, [8.5, 5, 2.5])
+    assert np.allclose(body.velocity, [-5, 0, 15])
+
+
+# Reflect keeps every body, and all of it, inside the world
+def test_reflect_swarm_stays_inside():
+    rng = np.random.default_rng(0)
+    engine = PhysicsEngine(bounds=BOUNDS, bounds_mode="reflect")
+    engine.register_many(
+        rng.uniform(1, 9, (200, 3)), rng.normal(0, 20, (200, 3)), radii=0.5
+    )
+
+    for _ in range(20):
+        engine.iterate(0.05)
+
+        positions = engine.state_arrays()["positions"]
+        assert len(positions) == 200
+        assert np.all((positions >= 0.5) & (positions <= 9.5))
+
+
+# Periodic: a body leaving through one side comes back in through the opposite one,
+# keeping its velocity
+def test_periodic_wrap():
+    engine, handle = one_body("periodic", [9.5, 0.2, 5], [10, -5, 0])
+    engine.iterate(0.1)
+
+    body = engine.get(handle)
+    assert np.allclose(body.position, [0.5, 9.7, 5])
+    assert np.allclose(body.velocity, [10, -5, 0])
+
+
+# Periodic: bodies on opposite sides of the domain touch through the boundary, and get
+# pushed apart across it
+def test_contact_across_boundary():
+    engine = PhysicsEngine(bounds=BOUNDS, bounds_mode="periodic")
+    engine.register_many([[0.3, 5, 5], [9.5, 5, 5]], [[-1, 0, 0], [1, 0, 0]], radii=0.5)
+    engine.iterate(0.01)
+
+    assert engine.contact_count == 1
+
+    x = engine.state_arrays()["positions"][:, 0]
+    assert x[0] > 0.3 and x[1] < 9.5
+
+
+# Despawn: bodies whose center leaves the world are removed, the others keep their
+# handles
+@pytest.mark.parametrize("position", [[9.5, 5, 5], [5, 0.5, 5], [5, 5, 9.99]])
+def test_despawn(position):
+    engine = PhysicsEngine(bounds=BOUNDS, bounds_mode="despawn")
+    leaving, staying = engine.register_many(
+        [position, [5, 5, 5]], [np.sign(np.subtract(position, 5)) * 10, [1, 0, 0]]
+    )
+    engine.iterate(0.1)
+
+    assert len(engine) == 1
+    assert engine.handles.tolist() == [staying]
+    assert np.allclose(engine.get(staying).position, [5.1, 5, 5])
+    with pytest.raises(KeyError):
+        engine.get(leaving)
@@ -0,0 +1,48 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PhysicalMixin import PhysicalPrimitiveType  # noqa: E402
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+
+
+# A 0.1 m sphere at 100 m/s towards a 0.1 m thick wall 1.5 m away, moving 1 m (ten
+# radii) per step: it's short of the wall after one step and past it after two
+def shoot(**kwargs):
+    engine = PhysicsEngine(**kwargs)
+    (ball,) = engine.register_many([[0.0, 0, 0]], [[100.0, 0, 0]], radii=0.1)
+    engine.register_many(
+        [[1.55, 0, 0]],
+        shapes=PhysicalPrimitiveType.BOX,
+        sizes=[0.1, 4, 4],
+        immovable=True,
+    )
+
+    xs = []
+    for _ in range(6):
+        engine.iterate(0.01)
+        xs.append(float(engine.get(ball).position[0]))
+
+    return np.array(xs), engine
+
+
+# Without CCD the sphere steps straight over the wall
+def test_tunnels_without_ccd():
+    xs, engine = shoot()
+
+    assert engine.contact_count == 0
+    assert xs[-1] > 1.6 + 0.1
+
+
+# With CCD it's stopped at the wall and never gets past it
+@pytest.mark.parametrize("deterministic", [False, True])
+@pytest.mark.parametrize("kernels", [None, "numpy"])
+def test_stops_at_wall(deterministic, kernels):
+    xs, engine = shoot(ccd=0.5, deterministic=deterministic, kernels=kernels)
+
+    assert engine.contact_count >= 1
+    assert np.all(xs < 1.5 - 0.1 + 1e-3)
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CompactBodies import CompactSphere  # noqa: E402
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+
+
+def sphere(position, velocity):
+    body = CompactSphere(radius=1.0)
+    body.position = np.array(position, dtype=float)
+    body.velocity = np.array(velocity, dtype=float)
+    return body
+
+
+def trajectory(engine, steps, dt=0.01):
+    states = []
+    for _ in range(steps):
+        engine.iterate(dt)
+        state = engine.state_arrays()
+        states.append((state["positions"].copy(), state["velocities"].copy()))
+
+    return states
+
+
+# Two spheres closing in on each other: the cached "apart" answer must not hide the
+# contact, and the solved contact must not be resolved again on the next steps
+@pytest.mark.parametrize("deterministic", [False, True])
+def test_approaching_pair_matches_uncached(deterministic):
+    runs = []
+    for contact_cache in (None, 0.05):
+        engine = PhysicsEngine(
+            deterministic=deterministic,
+            contact_cache=contact_cache,
+            record_contacts=True,
+        )
+        engine.register_object(sphere([0, 0, 0], [0, 0.5, 0.5]))
+        engine.register_object(sphere([0, 1.45, 1.45], [0, -0.5, -0.5]))
+
+        states = trajectory(engine, 12)
+        runs.append((states, len(engine.drain_contacts()["step"])))
+
+    (uncached, uncached_contacts), (cached, cached_contacts) = runs
+
+    assert cached_contacts == uncached_contacts == 1
+    for (p0, v0), (p1, v1) in zip(uncached, cached):
+        assert np.array_equal(p0, p1)
+        assert np.array_equal(v0, v1)
+
+
+# A swarm in a box: same trajectory with and without the cache, and the cache does skip
+# narrowphase calls
+def test_swarm_matches_uncached():
+    rng = np.random.default_rng(3)
+    positions = rng.uniform(-20, 20, (150, 3))
+    velocities = rng.uniform(-2, 2, (150, 3))
+
+    runs = []
+    for contact_cache in (None, 0.5):
+        engine = PhysicsEngine(
+            deterministic=True,
+            contact_cache=contact_cache,
+            bounds=([-25, -25, -25], [25, 25, 25]),
+            bounds_mode="reflect",
+        )
+        engine.register_many(positions, velocities, radii=1.0)
+
+        runs.append((trajectory(engine, 60), engine.contact_cache_stats()))
+
+    (uncached, _), (cached, stats) = runs
+
+    for (p0, v0), (p1, v1) in zip(uncached, cached):
+        assert np.array_equal(p0, p1)
+        assert np.array_equal(v0, v1)
+
+    assert stats["hits"] > 0
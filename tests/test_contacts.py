@@ -0,0 +1,32 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CompactBodies import CompactBox, CompactSphere  # noqa: E402
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+
+
+# A sphere dropped onto an immovable box: the box's recorded impulse is the velocity
+# change it actually got, i.e. none, in both collision modes
+@pytest.mark.parametrize("deterministic", [False, True])
+def test_immovable_body_gets_no_impulse(deterministic):
+    engine = PhysicsEngine(record_contacts=True, deterministic=deterministic)
+
+    ball = CompactSphere(radius=1.0)
+    ball.position = np.array([0.0, 1.9, 0.0])
+    ball.velocity = np.array([0.0, -5.0, 0.0])
+
+    floor = CompactBox(size=np.array([4.0, 2.0, 4.0]), immovable=True)
+
+    engine.register_object(ball)
+    engine.register_object(floor)
+    engine.iterate(0.01)
+
+    contacts = engine.drain_contacts()
+    assert len(contacts["step"]) == 1
+    assert np.array_equal(contacts["impulse_b"], [[0.0, 0.0, 0.0]])
+    assert np.allclose(contacts["impulse"], [[0.0, 5.0, 0.0]])
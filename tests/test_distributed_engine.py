@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CompactBodies import CompactSphere  # noqa: E402
+from DistributedEngine import DistributedEngine, _worker_main  # noqa: E402
+from IForceApplicator import IForceApplicator  # noqa: E402
+
+BOUNDS = ([0, 0, 0], [10, 10, 10])
+
+
+def sphere(x):
+    body = CompactSphere(radius=0.01)
+    body.position = np.array([x, 0.0, 0.0])
+    return body
+
+
+# One worker run in-process: queue a step and a stop, the worker loop drains both
+def step_worker(bodies, slab_lo, slab_hi, halo, last=False):
+    conn, worker_conn = multiprocessing.Pipe()
+    conn.send(("step", 1e-6, bodies, []))
+    conn.send(("stop",))
+
+    _worker_main(worker_conn, {}, slab_lo, slab_hi, 0, halo, last)
+
+    reply = conn.recv()
+    conn.close()
+    if isinstance(reply, Exception):
+        raise reply
+
+    return reply
+
+
+def xs(bodies):
+    return sorted(float(body.position[0]) for body in bodies)
+
+
+# An emigrant swap-removed out of the middle of the worker's list mustn't shift which
+# bodies are reported as ghosts
+def test_halo_after_emigration():
+    bodies = [sphere(x) for x in (0.5, 5.2, 2.6, 4.99, 2.4)]
+
+    emigrants, lower_halo, upper_halo = step_worker(bodies, 0.0, 5.0, halo=1.0)
+
+    assert xs(emigrants) == [5.2]
+    assert np.allclose(xs(lower_halo), [0.5])
+    assert np.allclose(xs(upper_halo), [4.99])
+
+
+# A swarm crossing slab boundaries in every direction, stepped by three worker
+# processes: no body is lost or duplicated on the way, and all of them stay in the world
+@pytest.mark.parametrize("bounds_mode", ["reflect", "periodic"])
+def test_bodies_conserved(bounds_mode):
+    rng = np.random.default_rng(0)
+    positions = rng.uniform(0, 10, (300, 3))
+    velocities = rng.normal(0, 3, (300, 3))
+    masses = rng.uniform(1, 2, 300)
+
+    with DistributedEngine(
+        workers=3, halo=0.5, bounds=BOUNDS, bounds_mode=bounds_mode
+    ) as engine:
+        engine.register_many(positions, velocities, masses=masses, radii=0.05)
+
+        for _ in range(40):
+            engine.iterate(0.05)
+
+        state = engine.state_arrays()
+
+    assert len(state["masses"]) == 300
+    assert np.array_equal(np.sort(state["masses"]), np.sort(masses))
+    assert np.all((state["positions"] >= 0) & (state["positions"] <= 10))
+    assert set(state["worker"].tolist()) == {0, 1, 2}
+
+
+# One body moving along +x is handed from slab to slab, and in a periodic world it
+# wraps from the last slab back into the first
+@pytest.mark.parametrize(
+    "bounds_mode, steps, x, worker",
+    [("reflect", 30, 7.0, 2), ("periodic", 55, 2.0, 0)],
+)
+def test_migration(bounds_mode, steps, x, worker):
+    with DistributedEngine(
+        workers=3, halo=0.5, bounds=BOUNDS, bounds_mode=bounds_mode
+    ) as engine:
+        engine.register_many([[1.0, 5.0, 5.0]], [[20.0, 0.0, 0.0]], radii=0.1)
+
+        workers = []
+        for _ in range(steps):
+            engine.iterate(0.01)
+            workers.append(int(engine.state_arrays()["worker"][0]))
+
+        state = engine.state_arrays()
+
+    assert len(state["masses"]) == 1
+    assert np.allclose(state["positions"][0], [x, 5.0, 5.0])
+    assert state["worker"][0] == worker
+
+    # Visited the slabs in order, never skipping one
+    visited = [w for i, w in enumerate(workers) if i == 0 or w != workers[i - 1]]
+    assert visited == ([0, 1, 2] if bounds_mode == "reflect" else [0, 1, 2, 0])
+
+
+# Fails the step on whichever worker owns a body below x = 2
+class FailLow(IForceApplicator):
+    def apply_forces(self, objects, dt):
+        if any(obj.position[0] < 2 for obj in objects):
+            raise UserWarning("FailLow: body below x = 2.")
+
+
+# A step failing on one worker raises, and the other workers' replies don't linger in
+# their pipes to answer the next request
+def test_worker_error_drains_replies():
+    with DistributedEngine(workers=3, halo=0.5, bounds=BOUNDS) as engine:
+        engine.register_many([[1.0, 5.0, 5.0], [5.0, 5.0, 5.0], [9.0, 5.0, 5.0]])
+        engine.add_force_applicator(FailLow())
+
+        with pytest.raises(UserWarning, match="FailLow"):
+            engine.iterate(0.01)
+
+        assert len(engine) == 3
@@ -0,0 +1,155 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "forces"))
+
+pytest.importorskip("numba")
+
+from AirResistanceApplicator import AirResistanceApplicator  # noqa: E402
+from CompactBodies import CompactBox  # noqa: E402
+from Kernels import NumbaKernels, NumpyKernels  # noqa: E402
+from MutualGravity import MutualGravity  # noqa: E402
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+
+ATMOSPHERE = (101325, 0.0065, 288.15, 9.80665, 6.3781e6, 0.0289652, 8.31445)
+
+DTYPES = [np.float32, np.float64]
+
+
+def both(kernel, *args):
+    return [getattr(k, kernel)(*args) for k in (NumpyKernels, NumbaKernels)]
+
+
+# Integration is bit-identical between the backends
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_integrate(dtype):
+    rng = np.random.default_rng(0)
+    positions = rng.normal(size=(10000, 3)).astype(dtype)
+    velocities = rng.normal(size=(10000, 3)).astype(dtype)
+    forces = rng.normal(size=(10000, 3))
+    masses = rng.uniform(0.5, 2.0, 10000)
+    movable = rng.random(10000) > 0.1
+
+    results = []
+    for kernels in (NumpyKernels, NumbaKernels):
+        p, v = positions.copy(), velocities.copy()
+        kernels.integrate(p, v, forces, masses, movable, dtype(0.01))
+        results.append((p, v))
+
+    assert np.array_equal(results[0][0], results[1][0])
+    assert np.array_equal(results[0][1], results[1][1])
+
+
+# Air density only agrees to a few ulp (compiled pow vs NumPy's), ~10 in float32
+@pytest.mark.parametrize("dtype, rtol", [(np.float32, 2e-6), (np.float64, 1e-15)])
+def test_air_density(dtype, rtol):
+    h = np.random.default_rng(0).uniform(0, 11000, 10000).astype(dtype)
+
+    numpy_rho, numba_rho = both("air_density", h, *ATMOSPHERE)
+
+    assert numpy_rho.dtype == numba_rho.dtype == dtype
+    np.testing.assert_allclose(numba_rho, numpy_rho, rtol=rtol)
+
+
+# Contact masks match exactly, for every mix of shapes; box/box pairs always pass
+@pytest.mark.parametrize("dtype", DTYPES)
+def test_touching(dtype):
+    rng = np.random.default_rng(0)
+    pos_a = rng.normal(size=(10000, 3)).astype(dtype)
+    pos_b = pos_a + rng.normal(scale=0.5, size=(10000, 3)).astype(dtype)
+    half_a = np.repeat(rng.uniform(0.1, 0.5, (10000, 1)), 3, axis=1).astype(dtype)
+    half_b = rng.uniform(0.1, 0.5, (10000, 3)).astype(dtype)
+    sphere_a = rng.random(10000) > 0.3
+    sphere_b = rng.random(10000) > 0.5
+    half_b[sphere_b] = half_b[sphere_b][:, :1]
+
+    numpy_mask, numba_mask = both(
+        "touching", pos_a, half_a, sphere_a, pos_b, half_b, sphere_b, 1e-9
+    )
+
+    assert np.array_equal(numpy_mask, numba_mask)
+    assert numpy_mask[~sphere_a & ~sphere_b].all()
+    assert 0 < numpy_mask[sphere_a | sphere_b].sum() < (sphere_a | sphere_b).sum()
+
+
+# The broadphase's y/z filter matches exactly, with and without wrapping
+@pytest.mark.parametrize("period", [[0.0, 0.0, 0.0], [10.0, 10.0, 10.0]])
+def test_sweep_overlap(period):
+    rng = np.random.default_rng(0)
+    center_a = rng.uniform(0, 10, (10000, 3))
+    center_b = rng.uniform(0, 10, (10000, 3))
+    half_a = rng.uniform(0.1, 3.0, (10000, 3))
+    half_b = rng.uniform(0.1, 3.0, (10000, 3))
+
+    numpy_mask, numba_mask = both(
+        "sweep_overlap", center_a, half_a, center_b, half_b, np.array(period)
+    )
+
+    assert np.array_equal(numpy_mask, numba_mask)
+    assert 0 < numpy_mask.sum() < len(numpy_mask)
+
+
+def world(bounds_mode, **kwargs):
+    rng = np.random.default_rng(1)
+    engine = PhysicsEngine(
+        deterministic=True,
+        bounds=([0, 0, 0], [6, 6, 6]),
+        bounds_mode=bounds_mode,
+        **kwargs,
+    )
+    engine.add_force_applicator(MutualGravity(G=1e-3, eps=0.1))
+    engine.register_many(
+        rng.uniform(0, 6, (100, 3)), rng.normal(size=(100, 3)), radii=0.2
+    )
+
+    floor = CompactBox(size=np.array([6.0, 0.5, 6.0]), immovable=True)
+    floor.position = np.array([3.0, 0.25, 3.0])
+    engine.register_object(floor)
+
+    return engine
+
+
+# A whole run lands on the same state hash with no kernels, NumPy kernels and Numba
+# kernels (air drag left out, it only agrees to a few ulp)
+@pytest.mark.parametrize("bounds_mode", ["reflect", "periodic"])
+def test_engine_parity(bounds_mode):
+    hashes = []
+    for kernels in (None, "numpy", "numba"):
+        engine = world(bounds_mode, kernels=kernels)
+        for _ in range(20):
+            engine.iterate(0.01)
+        hashes.append(engine.state_hash())
+
+    assert hashes[0] == hashes[1] == hashes[2]
+
+
+# With air drag, the kernel backends stay within rounding of each other
+def test_engine_parity_air_drag():
+    states = []
+    for kernels in ("numpy", "numba"):
+        engine = world("reflect", kernels=kernels)
+        engine.add_force_applicator(AirResistanceApplicator())
+        for _ in range(20):
+            engine.iterate(0.01)
+        states.append(engine.state_arrays()["positions"])
+
+    np.testing.assert_allclose(states[0], states[1], rtol=1e-12, atol=1e-12)
+
+
+# Two overlapping boxes hit the missing box/box narrowphase the same way with kernels
+# as without
+@pytest.mark.parametrize("kernels", [None, "numpy", "numba"])
+def test_box_box_raises(kernels):
+    engine = PhysicsEngine(kernels=kernels)
+    for x in (0.0, 0.5):
+        box = CompactBox(size=np.array([1.0, 1.0, 1.0]))
+        box.position = np.array([x, 0.0, 0.0])
+        engine.register_object(box)
+
+    with pytest.raises(UserWarning):
+        engine.iterate(0.01)
@@ -0,0 +1,148 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PhysicalMixin import PhysicalPrimitiveType  # noqa: E402
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+
+N = 300
+
+
+# Spheres and boxes of mixed sizes scattered over a 50 m cube
+def world(**kwargs):
+    rng = np.random.default_rng(0)
+    shapes = np.where(
+        rng.random(N) < 0.5, PhysicalPrimitiveType.SPHERE, PhysicalPrimitiveType.BOX
+    )
+
+    engine = PhysicsEngine(**kwargs)
+    engine.register_many(
+        rng.uniform(0, 50, (N, 3)),
+        shapes=shapes,
+        radii=rng.uniform(0.2, 2.0, N),
+        sizes=rng.uniform(0.4, 4.0, (N, 3)),
+    )
+
+    positions = engine.state_arrays()["positions"]
+    half = np.array([_half(obj) for obj in engine.objects])
+    is_sphere = np.array(
+        [obj.physical_primitive_type == PhysicalPrimitiveType.SPHERE for obj in engine]
+    )
+
+    return engine, positions, half, is_sphere
+
+
+def _half(obj):
+    if obj.physical_primitive_type == PhysicalPrimitiveType.SPHERE:
+        return np.full(3, obj.radius)
+    return np.array([obj.size.x, obj.size.y, obj.size.z]) / 2
+
+
+# Every object's bounding box against every query box
+def test_query_aabb():
+    engine, positions, half, _ = world()
+
+    rng = np.random.default_rng(1)
+    lo = rng.uniform(-5, 50, (40, 3))
+    hi = lo + rng.uniform(0, 15, (40, 3))
+
+    for q_lo, q_hi, found in zip(lo, hi, engine.query_aabb(lo, hi)):
+        overlap = np.all(
+            (positions - half <= q_hi) & (positions + half >= q_lo), axis=1
+        )
+        assert np.array_equal(found, np.flatnonzero(overlap))
+
+
+# Distance from every object's surface to every query center, with and without
+# wrap-around
+@pytest.mark.parametrize("periodic", [False, True])
+def test_query_radius(periodic):
+    if periodic:
+        engine, positions, half, is_sphere = world(
+            bounds=([0, 0, 0], [50, 50, 50]), bounds_mode="periodic"
+        )
+    else:
+        engine, positions, half, is_sphere = world()
+
+    rng = np.random.default_rng(2)
+    centers = rng.uniform(0, 50, (40, 3))
+    radii = rng.uniform(0.5, 8.0, 40)
+
+    for center, radius, found in zip(
+        centers, radii, engine.query_radius(centers, radii)
+    ):
+        d = positions - center
+        if periodic:
+            d -= 50 * np.round(d / 50)
+
+        dist = np.where(
+            is_sphere,
+            np.linalg.norm(d, axis=1) - half[:, 0],
+            np.linalg.norm(np.maximum(np.abs(d) - half, 0), axis=1),
+        )
+        assert np.array_equal(found, np.flatnonzero(dist <= radius))
+
+
+# Distance along a ray to one object, inf for a miss (direction normalized)
+def ray_distance(origin, direction, position, half, is_sphere):
+    if is_sphere:
+        m = origin - position
+        b = m @ direction
+        c = m @ m - half[0] ** 2
+        if c <= 0:
+            return 0.0
+        disc = b * b - c
+        if disc < 0 or b > 0:
+            return np.inf
+        return -b - np.sqrt(disc)
+
+    t_enter, t_exit = 0.0, np.inf
+    for k in range(3):
+        lo, hi = position[k] - half[k], position[k] + half[k]
+        if direction[k] == 0:
+            if not lo <= origin[k] <= hi:
+                return np.inf
+            continue
+        t1 = (lo - origin[k]) / direction[k]
+        t2 = (hi - origin[k]) / direction[k]
+        t_enter = max(t_enter, min(t1, t2))
+        t_exit = min(t_exit, max(t1, t2))
+
+    return t_enter if t_enter <= t_exit else np.inf
+
+
+# First hit along each ray against every object, from inside the world and outside it,
+# with a length limit on some rays
+def test_raycast():
+    engine, positions, half, is_sphere = world()
+
+    rng = np.random.default_rng(3)
+    origins = np.concatenate(
+        [rng.uniform(0, 50, (30, 3)), rng.uniform(-30, 80, (30, 3))]
+    )
+    directions = rng.normal(size=(60, 3))
+    max_distance = np.where(rng.random(60) < 0.3, rng.uniform(1, 20, 60), np.inf)
+
+    hits, distances = engine.raycast(origins, directions, max_distance)
+
+    unit = directions / np.linalg.norm(directions, axis=1)[:, np.newaxis]
+    for r in range(60):
+        t = np.array(
+            [
+                ray_distance(origins[r], unit[r], positions[i], half[i], is_sphere[i])
+                for i in range(N)
+            ]
+        )
+        best = np.argmin(t)
+
+        if t[best] == np.inf or t[best] > max_distance[r]:
+            assert hits[r] == -1 and distances[r] == np.inf
+        else:
+            assert hits[r] == best
+            assert distances[r] == pytest.approx(t[best], abs=1e-9)
+
+    assert 0 < np.sum(hits >= 0) < 60
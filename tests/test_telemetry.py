@@ -0,0 +1,94 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "forces"))
+
+from AirResistanceApplicator import AirResistanceApplicator  # noqa: E402
+from BasicGravity import BasicGravity  # noqa: E402
+from FieldForceApplicator import FieldForceApplicator  # noqa: E402
+from MutualGravity import MutualGravity  # noqa: E402
+from PhysicsEngine import PhysicsEngine  # noqa: E402
+from StaticLocalGravity import StaticLocalGravity  # noqa: E402
+from Telemetry import Telemetry  # noqa: E402
+
+
+def run(engine, telemetry, steps):
+    telemetry.start(engine=engine)
+    try:
+        for _ in range(steps):
+            engine.iterate(0.01)
+            telemetry.record_step(engine, 0.01)
+    finally:
+        telemetry.stop()
+
+
+# A second run with the same Telemetry reopens the sinks it closed after the first
+def test_reuse_after_stop(tmp_path):
+    path = tmp_path / "telemetry.ndjson"
+
+    engine = PhysicsEngine()
+    engine.register_many(np.random.default_rng(0).uniform(0, 100, (10, 3)), radii=0.1)
+
+    telemetry = Telemetry(interval=1e-9, path=path)
+    run(engine, telemetry, 3)
+    run(engine, telemetry, 3)
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 6
+    assert lines[-1]["bodies"] == 10
+    assert lines[-1]["step"] == 6
+
+
+def last_report(tmp_path, engine, **kwargs):
+    path = tmp_path / "telemetry.ndjson"
+    run(engine, Telemetry(interval=1e-9, path=path, **kwargs), 1)
+
+    return json.loads(path.read_text().splitlines()[-1])
+
+
+# Potential energy adds up every applicator's own: uniform gravity, Earth's gravity
+# with height, softened pairwise gravity, and nothing for drag
+def test_potential_energy(tmp_path):
+    positions = np.array([[0.0, 100.0, 0.0], [3.0, 2000.0, 4.0], [0.0, 0.0, 5.0]])
+    masses = np.array([1.0, 2.0, 3.0])
+
+    engine = PhysicsEngine()
+    engine.add_force_applicator(StaticLocalGravity([0.0, -1.0, 0.0]))
+    engine.add_force_applicator(BasicGravity())
+    engine.add_force_applicator(MutualGravity(G=0.5, eps=0.1))
+    engine.add_force_applicator(AirResistanceApplicator())
+    engine.register_many(positions, masses=masses, radii=0.1)
+
+    report = last_report(tmp_path, engine)
+
+    state = engine.state_arrays()
+    x, m = state["positions"], state["masses"]
+    h = x[:, 1]
+
+    uniform = np.sum(m * h)
+    earth = np.sum(m * BasicGravity.g0 * BasicGravity.R_E * h / (BasicGravity.R_E + h))
+    pairs = 0.0
+    for i in range(3):
+        for j in range(i + 1, 3):
+            r = np.sqrt(np.sum((x[i] - x[j]) ** 2) + 0.1**2)
+            pairs -= 0.5 * m[i] * m[j] / r
+
+    assert report["potential_energy"] == pytest.approx(uniform + earth + pairs)
+
+
+# An applicator without a known potential makes it null rather than a partial sum
+def test_unknown_potential_is_null(tmp_path):
+    engine = PhysicsEngine()
+    engine.add_force_applicator(StaticLocalGravity([0.0, -9.8, 0.0]))
+    engine.add_force_applicator(
+        FieldForceApplicator(field=np.ones((2, 2, 2, 3)), law="acceleration")
+    )
+    engine.register_many([[0.0, 1.0, 0.0]], radii=0.1)
+
+    assert last_report(tmp_path, engine)["potential_energy"] is None